@@ -27,7 +27,11 @@ This is used to create the tide calendar event *description* entry. E.g::
     [0]: {'meta_tide_url': 'http://tideschart.com/United-Kingdom/Scotland/
                                               Edinburgh/Dalgety-Bay-Beach',
           'meta_tide_location': 'Dalgety Bay Beach',
-          'meta_scrape_time': '2021-06-10T21:36:02'}
+          'meta_scrape_time': '2021-06-10T21:36:02',
+          'meta_tide_timezone': 'Europe/London'}
+
+The tide times scraped are local times of the tide location, in the time zone
+``meta_tide_timezone`` (``Europe/London`` if not present).
 
 In indices ``[1]`` to ``[7]`` are dictionaries containing the the scraped data
 of the tides for the next 7 days, i.e. index ``[1]`` will contain the tide
@@ -68,24 +72,57 @@ calendar tide events.
 
 All expample data shown above read from a tideschart scraper JSON file and
 output when this module is called with ``-l debug``.
+
+By default one 20 minute calendar event is created per tide. When called with
+``-g day`` instead one all day event is created per day, its summary and
+description listing all of the day's tide times and heights. E.g.::
+
+    {'summary': 'Tides HIGH 03:32 5.28m, low 09:11 1.22m, HIGH 15:47 5.2m, low 21:21 1.28m',
+     'start': {'date': '2021-06-10'},
+     'end': {'date': '2021-06-11'},
+     ...
+
+When the tides of a day already in the calendar change the day's event is
+patched.
+
+Each tide event is inserted with a deterministic event ID, created from the
+tide URL and the tide time, and its tide URL recorded in a private extended
+property. Only the events of the tide URL being synced are listed from the
+calendar and the tides not yet in the calendar are found by event ID, so
+several stations can share a calendar. Tide events added by earlier versions
+of Tides2Cal, without a deterministic ID, are matched by their start time on
+a station's first sync and tagged with the station's tide URL so that they
+are never added again. The calendar operations of a run are recorded
+in a write-ahead journal (see :mod:`sync_journal`). If a run dies part way
+through re-running the same command first completes the remaining operations
+from the journal, without recomputing them, then syncs the tide data as
+usual.
 '''
 
 # Standard imports
 import datetime
+import functools
 import json
 import logging
 import os
+import re
+import time
 import traceback
+import zoneinfo
+from typing import Iterator
 
 # Third-parth imports
 import plac
 from googleapiclient.discovery import build, Resource
+from googleapiclient.errors import HttpError
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 
 # Local imports
 from logging_helper import setup_log
+from event_template import STATION_PROPERTY, TideEventTemplate
+from sync_journal import SyncJournal, is_tide_event_id, tide_event_id
 
 # Python logger identifier, following initial set_up, retrieve logger using:
 #   log = logging.getLogger(MY_LOGGER)
@@ -94,6 +131,34 @@ MY_LOGGER = __name__
 # If modifying the scopes, delete the file given in token_json option
 SCOPES = ['https://www.googleapis.com/auth/calendar.events.owned']
 
+# Partial response, only the event fields used are requested when listing
+# calendar events, see
+# https://developers.google.com/calendar/api/guides/performance#partial-response
+EVENT_LIST_FIELDS = 'nextPageToken,items(id,start,summary)'
+# Fields of events listed to find tide events added by earlier versions
+LEGACY_EVENT_LIST_FIELDS = 'nextPageToken,items(id,start,summary,description)'
+# Maximum number of events per page allowed by events().list()
+EVENT_LIST_PAGE_SIZE = 2500
+
+# Time zone of tide times when not given in tide data meta data
+DEFAULT_TIME_ZONE = 'Europe/London'
+
+# Retention cleanup deletes events in batch requests of DELETE_BATCH_SIZE
+# deletes (Google recommends no more than 50), waiting DELETE_BATCH_SECS
+# between batches to stay within the API's rate limits
+DELETE_BATCH_SIZE = 50
+DELETE_BATCH_SECS = 1.0
+# Number of times rate limited deletes are retried, with exponential backoff
+DELETE_RETRIES = 5
+# Time from which old tide events are searched for when the calendar has not
+# been cleaned up before
+CLEANUP_EPOCH = '1970-01-01T00:00:00Z'
+
+# Summary and description of a tide event added by an earlier version of
+# Tides2Cal, before events were given deterministic IDs
+LEGACY_SUMMARY = re.compile('(1st|2nd|3rd|4th) tide (HIGH|low) [0-9.]+m')
+LEGACY_DESCRIPTION = 'tide event added by Tides2Cal'
+
 def do_google_credentials(token_json: str) -> Resource:
     '''
     Do what is necessary to connect to user's Google calender and return
@@ -146,13 +211,78 @@ def do_google_credentials(token_json: str) -> Resource:
     return service
 # end do_google_credentials()
 
-def rm_old_tides(tide_data: list) -> list:
+def tide_time_zone(scrape_meta: dict) -> str:
+    '''
+    Return the time zone of the scraped tide times.
+
+    :param scrape_meta: Meta data about the scrape.
+    :type scrape_meta: dict
+
+    :return: Time zone name
+    :rtype: str
+    '''
+    return scrape_meta.get('meta_tide_timezone', DEFAULT_TIME_ZONE)
+
+@functools.lru_cache(maxsize=None)
+def get_zone(time_zone: str) -> zoneinfo.ZoneInfo:
+    '''
+    Return, cached, the :class:`zoneinfo.ZoneInfo` of ``time_zone``.
+    '''
+    return zoneinfo.ZoneInfo(time_zone)
+
+@functools.lru_cache(maxsize=8192)
+def tide_time_key(date_time: str, time_zone: str) -> int:
+    '''
+    Return the time of a tide as seconds since the epoch, used to compare
+    tides with the time now and with legacy calendar events. Keys are cached
+    so each tide time is only parsed once.
+
+    :param date_time: Local tide time, e.g. ``2021-06-10T03:32:00``
+    :type date_time: str
+    :param time_zone: Time zone of ``date_time``.
+    :type time_zone: str
+
+    :return: Seconds since the epoch.
+    :rtype: int
+    '''
+    tide_datetime = datetime.datetime.fromisoformat(date_time)
+    return int(tide_datetime.replace(tzinfo=get_zone(time_zone)).timestamp())
+
+def event_time_key(date_time: str) -> int:
+    '''
+    Return the time of a calendar event, an RFC3339 timestamp with offset as
+    returned by Google calendar, as seconds since the epoch.
+
+    :param date_time: Event time, e.g. ``2021-06-10T03:32:00+01:00``, \
+        ``2021-06-10T19:32:00-07:00`` or ``2021-06-10T02:32:00Z``
+    :type date_time: str
+
+    :return: Seconds since the epoch.
+    :rtype: int
+    '''
+    if date_time.endswith('Z'):
+        date_time = date_time[:-1] + '+00:00'
+    return int(datetime.datetime.fromisoformat(date_time).timestamp())
+
+def is_legacy_tide_event(event: dict) -> bool:
+    '''
+    Return True if ``event``, listed with ``LEGACY_EVENT_LIST_FIELDS``, is a
+    tide event added by an earlier version of Tides2Cal, i.e. without a
+    deterministic tide event ID.
+    '''
+    return not is_tide_event_id(event['id']) and 'dateTime' in event['start'] and \
+        LEGACY_SUMMARY.fullmatch(event.get('summary', '')) is not None and \
+        LEGACY_DESCRIPTION in event.get('description', '')
+
+def rm_old_tides(tide_data: list, time_zone: str=DEFAULT_TIME_ZONE) -> list:
     '''
     From tide_data remove all tides that are in the past in respect to time
     now.
 
     :param tide_data: List containing all tide data.
     :type tide_data: list
+    :param time_zone: Time zone of tide times.
+    :type time_zone: str
 
     :return: List of tide data containing only tides in the future.
     :rtype: list
@@ -161,10 +291,9 @@ def rm_old_tides(tide_data: list) -> list:
 
     future_tides = []
 
-    now_datetime = datetime.datetime.now()
+    now_key = int(time.time())
     for tide in tide_data:
-        tide_datetime = datetime.datetime.fromisoformat(tide['date_time'])
-        if tide_datetime > now_datetime:
+        if tide_time_key(tide['date_time'], time_zone) > now_key:
             future_tides.append(tide)
             continue
         log.debug("Removing tide in past: %s", str(tide))
@@ -172,11 +301,65 @@ def rm_old_tides(tide_data: list) -> list:
     return future_tides
 # end rm_old_tides())
 
-def get_cal_tide_times(service: Resource, calendar_id: str, num_days: int=10) -> list:
+def iter_cal_events(service: Resource, calendar_id: str, time_min: str, time_max: str,
+                    fields: str=EVENT_LIST_FIELDS, tide_url: str=None) -> Iterator[dict]:
     '''
-    From user's Google calendar read all tide events occurring in the next
-    num_days from today and return list containing their start time, i.e.
-    the 'tide time' of the event.
+    Yield the events of user's Google calendar occurring between
+    ``time_min`` and ``time_max``, as each page of events is received.
+
+    All pages of events are requested, each page requesting only ``fields``
+    of the events and gzip compressed.
+
+    :param service: The googleapiclient.discovery.Resource providing access to \
+        user's calendar.
+    :type service: Resource
+    :param calendar_id: Google calendar id of calendar to retrieve events from.
+    :type calendar_id: str
+    :param time_min: Lower bound (exclusive) of event end times, RFC3339 timestamp.
+    :type time_min: str
+    :param time_max: Upper bound (exclusive) of event start times, RFC3339 timestamp.
+    :type time_max: str
+    :param fields: Partial response fields selector.
+    :type fields: str
+    :param tide_url: If given, only the tide events of this tide URL are listed.
+    :type tide_url: str
+
+    :return: Iterator of event resources, containing only ``fields``.
+    :rtype: Iterator[dict]
+    '''
+    log = logging.getLogger(MY_LOGGER)
+
+    list_args = {}
+    if tide_url is not None:
+        list_args['privateExtendedProperty'] = f"{STATION_PROPERTY}={tide_url}"
+    request = service.events().list(calendarId=calendar_id, timeMin=time_min,
+                                    timeMax=time_max, singleEvents=True,
+                                    orderBy='startTime', maxResults=EVENT_LIST_PAGE_SIZE,
+                                    fields=fields, **list_args)
+    page_num = 0
+    while request is not None:
+        # Google APIs only gzip responses to requests whose user agent also
+        # contains 'gzip', see
+        # https://developers.google.com/calendar/api/guides/performance#gzip
+        request.headers['accept-encoding'] = 'gzip'
+        user_agent = request.headers.get('user-agent', '')
+        if 'gzip' not in user_agent:
+            request.headers['user-agent'] = (user_agent + ' tides2cal (gzip)').strip()
+        response = request.execute()
+        page_num += 1
+        log.debug("Calendar '%s' events page %d: %d events", calendar_id, page_num,
+                  len(response.get('items', [])))
+        yield from response.get('items', [])
+        request = service.events().list_next(request, response)
+# end iter_cal_events()
+
+def get_cal_tide_event_ids(service: Resource, calendar_id: str, tide_url: str,
+                           num_days: int=10) -> tuple:
+    '''
+    From user's Google calendar read the tide events of ``tide_url``
+    occurring in the next num_days from today and return their event IDs,
+    and the start times of those that are legacy tide events, tagged by
+    :func:`tag_legacy_tide_events`.
 
     :param service: The googleapiclient.discovery.Resource providing access to \
         user's calendar.
@@ -184,12 +367,16 @@ def get_cal_tide_times(service: Resource, calendar_id: str, num_days: int=10) ->
     :param calendar_id: Google calendar id of calendar to retrieve tide time \
         events from.
     :type calendar_id: str
+    :param tide_url: URL tide data was scraped from, only this station's tide \
+        events are read.
+    :type tide_url: str
     :param num_days: The number of days to read searching for all tide events.
     :type num_days: int
 
-    :return: List of current tide event start times as strings in Google event \
-        data time format.
-    :rtype: list
+    :return: Tuple of the set of event IDs of the station's current tide \
+        events and the set of start times, seconds since the epoch, of its \
+        legacy tide events.
+    :rtype: tuple
     '''
     log = logging.getLogger(MY_LOGGER)
 
@@ -198,10 +385,7 @@ def get_cal_tide_times(service: Resource, calendar_id: str, num_days: int=10) ->
     now = now_datetime.isoformat() + 'Z' # 'Z' indicates UTC time
     until = until_datetime.isoformat() + 'Z'
     log.info("Getting '%s' calendar events from %s until %s", calendar_id, now, until)
-    events_result = service.events().list(calendarId=calendar_id, timeMin=now,
-                                          timeMax=until, singleEvents=True,
-                                          orderBy='startTime').execute()
-    events = events_result.get('items', [])
+    events = iter_cal_events(service, calendar_id, now, until, tide_url=tide_url)
 
     # Following debug logging a bit of overkill during normal operation
     # considering info debug immediately after
@@ -216,7 +400,9 @@ def get_cal_tide_times(service: Resource, calendar_id: str, num_days: int=10) ->
     #            print("\t" + start, event['summary'])
 
 
-    tide_events = [e for e in events if 'tide' in e['summary'].lower()]
+    # Only tide events at a time, not the all day events of -g day
+    tide_events = [e for e in events if 'tide' in e.get('summary', '').lower()
+                   and 'dateTime' in e['start']]
     if log.getEffectiveLevel() <= logging.INFO:
         if not tide_events:
             log.info("No *tide* calendar events found in the next %d days", num_days)
@@ -227,30 +413,78 @@ def get_cal_tide_times(service: Resource, calendar_id: str, num_days: int=10) ->
                 start = event['start'].get('dateTime', event['start'].get('date'))
                 print("\t" + start, event['summary'])
 
-    tide_event_times = []
-    for event in tide_events:
-        # We're not interested in timezone as scraped tide times do not include
-        # timezone so only use string before '+'
-        # e.g.    2021-06-05T02:30:00+01:00
-        # becomes 2021-06-05T02:30:00
-        tide_time = event['start'].get('dateTime').split('+', 1)[0]
-        tide_event_times.append(tide_time)
+    tide_event_ids = {event['id'] for event in tide_events}
+    # Event times include their UTC offset, e.g. 2021-06-05T02:30:00+01:00,
+    # comparing as seconds since the epoch is independent of time zone
+    legacy_times = {event_time_key(event['start']['dateTime']) for event in tide_events
+                    if not is_tide_event_id(event['id'])}
+
+    log.debug("Calendar tide event IDs: %s", str(tide_event_ids))
 
-    log.debug("Calendar tide event times: %s", str(tide_event_times))
+    return tide_event_ids, legacy_times
+# end get_cal_tide_event_ids()
 
-    return tide_event_times
-# end get_cal_tide_times()
+def get_legacy_tide_events(service: Resource, calendar_id: str, tide_url: str,
+                           num_days: int=10) -> list:
+    '''
+    From user's Google calendar read the tide events of ``tide_url``
+    occurring in the next num_days from today that were added by an earlier
+    version of Tides2Cal, see :func:`is_legacy_tide_event`, and have not yet
+    been tagged with the station's tide URL. Lists every event of the
+    calendar, so is only called on a station's first sync.
 
-def get_new_tide_data(tide_times_in_cal: list, tide_data: list) -> list:
+    :return: List of legacy tide events.
+    :rtype: list
+    '''
+    log = logging.getLogger(MY_LOGGER)
+
+    now_datetime = datetime.datetime.utcnow()
+    until_datetime = now_datetime + datetime.timedelta(days=num_days)
+    legacy_events = [e for e in iter_cal_events(service, calendar_id,
+                                                now_datetime.isoformat() + 'Z',
+                                                until_datetime.isoformat() + 'Z',
+                                                fields=LEGACY_EVENT_LIST_FIELDS)
+                     if is_legacy_tide_event(e) and e['description'].endswith(f"from {tide_url}")]
+
+    log.info("In the next %d days %d legacy tide calendar events found", num_days,
+             len(legacy_events))
+
+    return legacy_events
+# end get_legacy_tide_events()
+
+def tag_legacy_tide_events(service: Resource, calendar_id: str, tide_url: str,
+                           legacy_events: list) -> None:
+    '''
+    Record ``tide_url`` in the private extended property of each legacy tide
+    event, so they are listed by later syncs of the station.
+    '''
+    operations = [('patch', event['id'],
+                   {'extendedProperties': {'private': {STATION_PROPERTY: tide_url}}})
+                  for event in legacy_events]
+    run_cal_operations(service, calendar_id, operations)
+# end tag_legacy_tide_events()
+
+def get_new_tide_data(tide_ids_in_cal: set, tide_data: list, tide_url: str,
+                      legacy_times: set=frozenset(),
+                      time_zone: str=DEFAULT_TIME_ZONE) -> list:
     '''
     Return list of tide data dictionaries containing tides not already in the
-    calendar.
+    calendar, i.e. whose deterministic event ID, see
+    :func:`sync_journal.tide_event_id`, is not in the calendar and whose time
+    is not that of a legacy tide event.
 
-    :param tide_times_in_cal: List of tide times already in caledar, list \
-        contains only the start time of the calendar event.
-    :type tide_times_in_cal: list
+    :param tide_ids_in_cal: Set of IDs of tide events of ``tide_url`` already \
+        in calendar, as returned by :func:`get_cal_tide_event_ids`.
+    :type tide_ids_in_cal: set
     :param tide_data: List of dictionaries containing latest tide data.
     :type tide_data: list
+    :param tide_url: URL tide data was scraped from.
+    :type tide_url: str
+    :param legacy_times: Start times, seconds since the epoch, of the \
+        station's legacy tide events.
+    :type legacy_times: set
+    :param time_zone: Time zone of tide times.
+    :type time_zone: str
 
     :return: List of dictionaries containing data of new tides.
     :rtype: list
@@ -258,7 +492,8 @@ def get_new_tide_data(tide_times_in_cal: list, tide_data: list) -> list:
     log = logging.getLogger(MY_LOGGER)
 
     new_tide_data = [td for td in tide_data
-                        if td['date_time'] not in tide_times_in_cal]
+                     if tide_event_id(tide_url, td['date_time']) not in tide_ids_in_cal
+                     and tide_time_key(td['date_time'], time_zone) not in legacy_times]
 
     log.info("Number of new tides already in calendar = %d",
              (len(tide_data) - len(new_tide_data)))
@@ -288,42 +523,10 @@ def get_new_tide_events(scrape_meta: dict, tide_data: list) -> list:
     '''
     log = logging.getLogger(MY_LOGGER)
 
-    # The description text of each tide event is the same
-    now_datetime = datetime.datetime.now()
-    desc_time_str = f"{now_datetime.strftime('%a %d %b %Y')} at " + \
-                    f"{now_datetime.strftime('%H:%M')}"
-    tide_location = scrape_meta['meta_tide_location']
-    tide_url = scrape_meta['meta_tide_url']
-    scrape_datetime = datetime.datetime.fromisoformat(scrape_meta['meta_scrape_time'])
-    scrape_time_str = f"{scrape_datetime.strftime('%a %d %b %Y')} at " + \
-                      f"{scrape_datetime.strftime('%H:%M')}"
-    desc_text = f"<b>{tide_location}</b> tide event added by Tides2Cal on {desc_time_str}.<br>" +\
-                f"Tide data scraped on {scrape_time_str} from {tide_url}"
-
-    new_tide_events = []
-    for tide in tide_data:
-        if tide['is_high']:
-            state = 'HIGH'
-            color_id = 9 # blue
-        else:
-            state = 'low'
-            color_id = 11 # red
-        tide_datetime = datetime.datetime.fromisoformat(tide['date_time'])
-        event_end_datetime = tide_datetime + datetime.timedelta(minutes=20)
-        event = {
-            'summary': f"{tide['number']} tide {state} {tide['height']}",
-            'description': desc_text,
-            'colorId': color_id,
-            'start': {
-                'dateTime': f"{tide['date_time']}",
-                'timeZone': 'Europe/London',
-            },
-            'end': {
-                'dateTime': f"{event_end_datetime.strftime('%Y-%m-%dT%H:%M:%S')}",
-                'timeZone': 'Europe/London',
-            }
-        }
-        new_tide_events.append(event)
+    # Everything that is the same for each tide event is done once by the
+    # template
+    template = TideEventTemplate(scrape_meta, tide_time_zone(scrape_meta))
+    new_tide_events = list(template.events(tide_data))
 
     if log.getEffectiveLevel() <= logging.DEBUG:
         log.debug("New tide events to be added to calendar:")
@@ -333,7 +536,160 @@ def get_new_tide_events(scrape_meta: dict, tide_data: list) -> list:
     return new_tide_events
 # end get_new_tide_events()
 
-def add_cal_tide_events(service: Resource, calendar_id: str, new_tide_events: list) -> None:
+def rm_old_tide_days(tide_data: list, time_zone: str=DEFAULT_TIME_ZONE) -> list:
+    '''
+    From tide_data remove all tides of days before today, i.e. today's tides
+    are kept even if they are in the past.
+
+    :param tide_data: List containing all tide data.
+    :type tide_data: list
+    :param time_zone: Time zone of tide times, the day is today in this zone.
+    :type time_zone: str
+
+    :return: List of tide data containing only tides of today or later days.
+    :rtype: list
+    '''
+    today = datetime.datetime.now(get_zone(time_zone)).date().isoformat()
+    return [tide for tide in tide_data if tide['date_time'][:10] >= today]
+# end rm_old_tide_days()
+
+def get_cal_tide_day_events(service: Resource, calendar_id: str, tide_url: str,
+                            num_days: int=10) -> dict:
+    '''
+    From user's Google calendar read the all day tide events of ``tide_url``,
+    as created by :func:`get_day_tide_events`, occurring in the next num_days
+    from today.
+
+    :param service: The googleapiclient.discovery.Resource providing access to \
+        user's calendar.
+    :type service: Resource
+    :param calendar_id: Google calendar id of calendar to retrieve tide day \
+        events from.
+    :type calendar_id: str
+    :param tide_url: URL tide data was scraped from, only this station's tide \
+        day events are read.
+    :type tide_url: str
+    :param num_days: The number of days to read searching for tide day events.
+    :type num_days: int
+
+    :return: Dictionary of tide day events keyed by event ID, each event \
+        containing only its ``id``, ``start`` and ``summary``.
+    :rtype: dict
+    '''
+    log = logging.getLogger(MY_LOGGER)
+
+    now_datetime = datetime.datetime.utcnow()
+    until_datetime = now_datetime + datetime.timedelta(days=num_days)
+    now = now_datetime.isoformat() + 'Z' # 'Z' indicates UTC time
+    until = until_datetime.isoformat() + 'Z'
+    log.info("Getting '%s' calendar day events from %s until %s", calendar_id, now, until)
+
+    tide_day_events = {}
+    for event in iter_cal_events(service, calendar_id, now, until, tide_url=tide_url):
+        if 'date' in event['start']:
+            tide_day_events[event['id']] = event
+
+    log.info("In the next %d days %d *tide* calendar day events found", num_days,
+             len(tide_day_events))
+
+    return tide_day_events
+# end get_cal_tide_day_events()
+
+def get_day_tide_events(scrape_meta: dict, tide_data: list) -> list:
+    '''
+    Return list of all day Google calendar events, one per day of
+    ``tide_data``, each listing all of the day's tides.
+
+    The event is coloured as the day's first tide, blue if it is a high tide,
+    red if low.
+
+    :param scrape_meta: Meta data about the scrape added to event descriptions.
+    :type scrape_meta: dict
+    :param tide_data: List of dictionaries containing tide data for which Google \
+        calendar events are to be created.
+    :type tide_data: list
+
+    :return: List of Google calendar all day events.
+    :rtype: list
+    '''
+    log = logging.getLogger(MY_LOGGER)
+
+    # Tide events are created for a day's tides, then combined
+    day_tides = {}
+    for tide, event in zip(tide_data, get_new_tide_events(scrape_meta, tide_data)):
+        day_tides.setdefault(tide['date_time'][:10], []).append((tide, event))
+
+    tide_url = scrape_meta['meta_tide_url']
+    day_events = []
+    for date_str, tides in day_tides.items():
+        first_event = tides[0][1]
+        tide_strs = [f"{'HIGH' if t['is_high'] else 'low'} {t['date_time'][11:16]} " +
+                     f"{t['height']}" for t, _ in tides]
+        end_date = datetime.date.fromisoformat(date_str) + datetime.timedelta(days=1)
+        day_events.append({
+            'id': tide_event_id(tide_url, date_str),
+            'summary': "Tides " + ', '.join(tide_strs),
+            'description': '<br>'.join(f"{t['number']} tide {tide_str}"
+                                       for (t, _), tide_str in zip(tides, tide_strs)) +
+                           '<br><br>' + first_event['description'],
+            'colorId': first_event['colorId'],
+            'start': {
+                'date': date_str,
+            },
+            'end': {
+                'date': end_date.isoformat(),
+            },
+            'extendedProperties': first_event['extendedProperties'],
+        })
+
+    if log.getEffectiveLevel() <= logging.DEBUG:
+        log.debug("Tide day events:")
+        for index, event in enumerate(day_events):
+            print(f"[{index}]: {event}")
+
+    return day_events
+# end get_day_tide_events()
+
+def get_day_event_operations(cal_day_events: dict, day_events: list) -> list:
+    '''
+    Return the calendar operations needed to bring the tide day events in the
+    calendar up to date: an insert for each day not in the calendar and a
+    patch for each day whose tides have changed. Days are matched by their
+    deterministic event ID, so only events created by tides2cal for the same
+    tide URL are ever patched.
+
+    :param cal_day_events: Tide day events in calendar, as returned by \
+        :func:`get_cal_tide_day_events`.
+    :type cal_day_events: dict
+    :param day_events: Latest tide day events, as returned by \
+        :func:`get_day_tide_events`.
+    :type day_events: list
+
+    :return: List of ``(method, event_id, body)`` tuples.
+    :rtype: list
+    '''
+    log = logging.getLogger(MY_LOGGER)
+
+    operations = []
+    for event in day_events:
+        cal_event = cal_day_events.get(event['id'])
+        if cal_event is None:
+            operations.append(('insert', event['id'], event))
+        elif cal_event.get('summary') != event['summary']:
+            log.info("Tides of %s changed from '%s'", event['start']['date'],
+                     cal_event.get('summary'))
+            body = {k: v for k, v in event.items() if k != 'id'}
+            operations.append(('patch', event['id'], body))
+
+    log.info("Tide day events to insert = %d, to patch = %d",
+             sum(1 for op in operations if op[0] == 'insert'),
+             sum(1 for op in operations if op[0] == 'patch'))
+
+    return operations
+# end get_day_event_operations()
+
+def add_cal_tide_events(service: Resource, calendar_id: str, new_tide_events: list,
+                        journal: SyncJournal=None) -> None:
     '''
     Add tide event to Google calendar if not already present in calendar.
 
@@ -346,14 +702,253 @@ def add_cal_tide_events(service: Resource, calendar_id: str, new_tide_events: li
     :param new_tide_events: List of new tide calendar events to be added to \
         the calendar.
     :type new_tide_events: list
+    :param journal: If given, the journal the planned and completed inserts \
+        are recorded in.
+    :type journal: SyncJournal
 
     :return: None
     '''
-    for event in new_tide_events:
-        service.events().insert(calendarId=calendar_id, body=event).execute()
+    operations = [('insert', event['id'], event) for event in new_tide_events]
+    if journal is not None:
+        journal.plan(calendar_id, operations)
+
+    run_cal_operations(service, calendar_id, operations, journal)
 
 # end add_cal_tide_events()
 
+def run_cal_operations(service: Resource, calendar_id: str, operations: list,
+                       journal: SyncJournal=None) -> None:
+    '''
+    Execute calendar event operations, ``insert`` or ``patch``, recording
+    each in ``journal`` as it completes. An insert of an event whose ID is already in the calendar, i.e.
+    the insert was completed by a previous run, is treated as completed.
+
+    :param service: The googleapiclient.discovery.Resource providing access to \
+        user's calendar.
+    :type service: Resource
+    :param calendar_id: Google calendar id of calendar operations are for.
+    :type calendar_id: str
+    :param operations: List of ``(method, event_id, body)`` tuples.
+    :type operations: list
+    :param journal: If given, the journal the operations are recorded in.
+    :type journal: SyncJournal
+
+    :return: None
+    '''
+    log = logging.getLogger(MY_LOGGER)
+
+    for method, event_id, body in operations:
+        try:
+            if method == 'insert':
+                service.events().insert(calendarId=calendar_id, body=body).execute()
+            elif method == 'patch':
+                service.events().patch(calendarId=calendar_id, eventId=event_id,
+                                       body=body).execute()
+            else:
+                raise ValueError(f"Unknown calendar operation '{method}'")
+        except HttpError as exc:
+            if exc.resp.status != 409:
+                raise
+            log.info("Event '%s' already in calendar '%s'", event_id, calendar_id)
+        if journal is not None:
+            journal.done(event_id)
+
+    if journal is not None:
+        journal.complete()
+
+# end run_cal_operations()
+
+def delete_cal_events(service: Resource, calendar_id: str, event_ids: list) -> int:
+    '''
+    Delete events from Google calendar, using batch requests of
+    ``DELETE_BATCH_SIZE`` deletes waiting ``DELETE_BATCH_SECS`` between
+    batches. Deletes that are rate limited are retried with exponential
+    backoff, deletes of events already deleted are ignored.
+
+    :param service: The googleapiclient.discovery.Resource providing access to \
+        user's calendar.
+    :type service: Resource
+    :param calendar_id: Google calendar id of calendar to delete events from.
+    :type calendar_id: str
+    :param event_ids: IDs of events to be deleted.
+    :type event_ids: list
+
+    :return: Number of events deleted.
+    :rtype: int
+    '''
+    log = logging.getLogger(MY_LOGGER)
+
+    deleted = 0
+    to_delete = list(event_ids)
+    for retry in range(DELETE_RETRIES + 1):
+        rate_limited = []
+        failed = []
+        def on_delete(request_id, _response, exception):
+            nonlocal deleted
+            if exception is None:
+                deleted += 1
+            elif isinstance(exception, HttpError) and exception.resp.status in (404, 410):
+                log.debug("Event '%s' already deleted", request_id)
+            elif isinstance(exception, HttpError) and exception.resp.status in (403, 429):
+                rate_limited.append(request_id)
+            else:
+                failed.append((request_id, exception))
+
+        for start in range(0, len(to_delete), DELETE_BATCH_SIZE):
+            if start > 0:
+                time.sleep(DELETE_BATCH_SECS)
+            batch = service.new_batch_http_request(callback=on_delete)
+            for event_id in to_delete[start:start + DELETE_BATCH_SIZE]:
+                batch.add(service.events().delete(calendarId=calendar_id,
+                                                  eventId=event_id),
+                          request_id=event_id)
+            batch.execute()
+
+        if failed:
+            raise RuntimeError(f"Failed to delete {len(failed)} events from calendar " +
+                               f"'{calendar_id}', first failure: {failed[0][1]}")
+        if not rate_limited:
+            break
+        backoff_secs = DELETE_BATCH_SECS * 2 ** (retry + 1)
+        log.warning("%d deletes rate limited, retrying in %.0f seconds",
+                    len(rate_limited), backoff_secs)
+        time.sleep(backoff_secs)
+        to_delete = rate_limited
+    else:
+        raise RuntimeError(f"{len(to_delete)} deletes from calendar '{calendar_id}' " +
+                           f"still rate limited after {DELETE_RETRIES} retries")
+
+    return deleted
+# end delete_cal_events()
+
+def cleanup_old_tide_events(service: Resource, calendar_id: str, retention_days: int,
+                            cleanup_json: str, read_only: bool=False) -> int:
+    '''
+    Delete tide events that started more than ``retention_days`` ago from
+    Google calendar. Only events created by tides2cal, i.e. whose ID is a
+    deterministic tide event ID (see :func:`sync_journal.tide_event_id`) or
+    that are legacy tide events (see :func:`is_legacy_tide_event`), are
+    deleted, any other event is left alone whatever its summary.
+
+    The time up to which the calendar has been cleaned up is saved, per
+    calendar, in ``cleanup_json``. Only tide events after this time are
+    searched for, so each cleanup only handles events that have become old
+    since the previous cleanup. The saved time is advanced as each batch of
+    deletes completes so an interrupted cleanup continues from where it
+    stopped.
+
+    Deletes are only requested for the old events found, in batches of
+    ``DELETE_BATCH_SIZE`` waiting ``DELETE_BATCH_SECS`` between batches, see
+    :func:`delete_cal_events`.
+
+    :param service: The googleapiclient.discovery.Resource providing access to \
+        user's calendar.
+    :type service: Resource
+    :param calendar_id: Google calendar id of calendar to clean up.
+    :type calendar_id: str
+    :param retention_days: Tide events that started more than this number of \
+        days ago are deleted.
+    :type retention_days: int
+    :param cleanup_json: Name of file the cleanup times are saved in.
+    :type cleanup_json: str
+    :param read_only: When True do NOT delete events, only count them.
+    :type read_only: bool
+
+    :return: Number of old tide events deleted, or found if ``read_only``.
+    :rtype: int
+    '''
+    log = logging.getLogger(MY_LOGGER)
+
+    cleanup_times = {}
+    if os.path.exists(cleanup_json):
+        with open(cleanup_json, 'r') as cleanup_file:
+            cleanup_times = json.load(cleanup_file)
+
+    def save_cleanup_time(cleanup_time: str) -> None:
+        cleanup_times[calendar_id] = cleanup_time
+        with open(cleanup_json + '.tmp', 'w') as cleanup_file:
+            json.dump(cleanup_times, cleanup_file, indent=1)
+        os.replace(cleanup_json + '.tmp', cleanup_json)
+
+    since = cleanup_times.get(calendar_id, CLEANUP_EPOCH)
+    until_datetime = datetime.datetime.utcnow() - datetime.timedelta(days=retention_days)
+    until = until_datetime.strftime('%Y-%m-%dT%H:%M:%SZ')
+    if event_time_key(since) >= event_time_key(until):
+        # Retention period increased since the previous cleanup
+        log.info("Calendar '%s' already cleaned up until %s", calendar_id, since)
+        return 0
+    log.info("Cleaning up '%s' calendar tide events from %s until %s", calendar_id,
+             since, until)
+
+    # List all old events before deleting any, so the listing's pages are
+    # not changed by the deletes
+    old_events = [e for e in iter_cal_events(service, calendar_id, since, until,
+                                             fields=LEGACY_EVENT_LIST_FIELDS)
+                  if is_tide_event_id(e['id']) or is_legacy_tide_event(e)]
+    num_old_events = 0
+    for start in range(0, len(old_events), DELETE_BATCH_SIZE):
+        if start > 0 and not read_only:
+            time.sleep(DELETE_BATCH_SECS)
+        num_old_events += _cleanup_batch(service, calendar_id,
+                                         old_events[start:start + DELETE_BATCH_SIZE],
+                                         read_only, save_cleanup_time)
+
+    if not read_only:
+        save_cleanup_time(until)
+    log.info("Old tide events %s calendar '%s' = %d",
+             'found in' if read_only else 'deleted from', calendar_id, num_old_events)
+
+    return num_old_events
+# end cleanup_old_tide_events()
+
+def _cleanup_batch(service: Resource, calendar_id: str, old_events: list,
+                   read_only: bool, save_cleanup_time) -> int:
+    '''
+    Delete a batch of old events found by :func:`cleanup_old_tide_events`
+    then save the start time of the last as the calendar's cleanup time.
+    '''
+    if read_only:
+        return len(old_events)
+
+    deleted = delete_cal_events(service, calendar_id, [e['id'] for e in old_events])
+    last_start = old_events[-1]['start']
+    if 'dateTime' in last_start:
+        save_cleanup_time(last_start['dateTime'])
+    else:
+        save_cleanup_time(last_start['date'] + 'T00:00:00Z')
+    return deleted
+# end _cleanup_batch()
+
+def sync_tide_day_events(service: Resource, calendar_id: str, scrape_meta: dict,
+                         tide_data: list, journal: SyncJournal, read_only: bool) -> None:
+    '''
+    Insert, or patch if their tides have changed, the tide day events of
+    ``tide_data`` in user's Google calendar.
+    '''
+    cal_day_events = get_cal_tide_day_events(service, calendar_id,
+                                             scrape_meta['meta_tide_url'])
+
+    day_events = get_day_tide_events(scrape_meta, tide_data)
+
+    operations = get_day_event_operations(cal_day_events, day_events)
+
+    if len(operations) > 0:
+        if not read_only:
+            journal.plan(calendar_id, operations)
+            run_cal_operations(service, calendar_id, operations, journal)
+            print(f"Tide day events inserted or patched in calendar '{calendar_id}' = " +
+                  f"{len(operations)}")
+        else:
+            print(f"{__name__} called with --read-only=True - tide day events NOT " +
+                  "added to calendar.")
+            print(f"Without use of --read-only {len(operations)} tide day events " +
+                  "would be inserted or patched, details:")
+            for operation in operations:
+                print(operation)
+    else:
+        print(f"No new or changed tide days to be added to calendar '{calendar_id}'")
+# end sync_tide_day_events()
+
 @plac.opt('cal_name', "User's Google calendar name tide events are to be " + \
           "added to.", type=str)
 @plac.opt('token_json', "User's Google calendar access and refresh tokens - is " + \
@@ -361,18 +956,60 @@ def add_cal_tide_events(service: Resource, calendar_id: str, new_tide_events: li
           "first time.", type=str)
 @plac.opt('json_in', "Input JSON file containing tide data to be used to " + \
           "create Google calendar events.", type=str)
+@plac.opt('journal', "Write-ahead journal of calendar operations, used to resume " + \
+          "an interrupted run. Defaults to JSON_IN with '.journal' appended.", type=str,
+          abbrev='J')
+@plac.opt('retention_days', "When greater than 0 delete tide events that started " + \
+          "more than this number of days ago from the calendar.", type=int,
+          abbrev='R')
+@plac.opt('cleanup_json', "File the time up to which each calendar's old tide " + \
+          "events have been deleted is saved in.", type=str, abbrev='C')
+@plac.opt('granularity', "Create a calendar event per tide, or a single all " + \
+          "day event per day listing the day's tides.", type=str,
+          choices=['tide', 'day'])
 @plac.opt('read_only', "When False do NOT create new calendar tide events, " + \
           'only read tide and display on screen.', type=bool)
 @plac.opt('log', "Set logging level.", type=str,
           choices=['off', 'info', 'debug'])
 def main(cal_name: str='primary', token_json: str='cal_token.json',
-         json_in: str='tides.json', read_only: bool=False, log: str='off'):
+         json_in: str='tides.json', journal: str=None, retention_days: int=0,
+         cleanup_json: str='cal_cleanup.json', granularity: str='tide',
+         read_only: bool=False, log: str='off'):
     '''
     Read JSON file produced by scraper containing tide data and create
     Google calendar tide events.
     '''
     log = setup_log(MY_LOGGER, log)
 
+    # Old events are cleaned up whatever the state of the tide data or journal
+    cal_service = None
+    if retention_days > 0:
+        cal_service = do_google_credentials(token_json)
+        try:
+            num_old_events = cleanup_old_tide_events(cal_service, cal_name, retention_days,
+                                                     cleanup_json, read_only)
+            print(f"Old tide events {'found in' if read_only else 'deleted from'} " +
+                  f"calendar '{cal_name}' = {num_old_events}")
+        except Exception as exc: # pylint: disable=broad-except
+            # Cleanup is retried by the next run, tide events are still added
+            log.error("Cleanup of old tide events from calendar '%s' failed: %s",
+                      cal_name, exc)
+
+    sync_journal = SyncJournal(journal if journal else json_in + '.journal')
+    pending_operations = [] if read_only else sync_journal.pending(cal_name)
+    if len(pending_operations) > 0:
+        log.warning("Resuming interrupted run from journal '%s', %d calendar %s",
+                    sync_journal.journal_file, len(pending_operations),
+                    "operations to complete")
+        sync_journal.resume()
+        if cal_service is None:
+            cal_service = do_google_credentials(token_json)
+        run_cal_operations(cal_service, cal_name, pending_operations, sync_journal)
+        print(f"Tides events resumed from journal in calendar '{cal_name}' = " +
+              f"{len(pending_operations)}")
+        # Continue to sync the current tide data, which may hold tides the
+        # interrupted run did not
+
     log.info("Reading tide data from '%s'", json_in)
 
     json_data = None
@@ -393,7 +1030,11 @@ def main(cal_name: str='primary', token_json: str='cal_token.json',
     # dictionaries
     tide_data = json_data[8]['tide_list']
 
-    cal_tide_data = rm_old_tides(tide_data)
+    time_zone = tide_time_zone(json_data[0])
+    if granularity == 'day':
+        cal_tide_data = rm_old_tide_days(tide_data, time_zone)
+    else:
+        cal_tide_data = rm_old_tides(tide_data, time_zone)
 
     if len(cal_tide_data) == 0:
         log.warning("Tide data file '%s' does not contain any tides %s %s '%s'", json_in,
@@ -403,17 +1044,33 @@ def main(cal_name: str='primary', token_json: str='cal_token.json',
     log.info("Tides in past removed from tide data = %d",
              (len(tide_data) - len(cal_tide_data)))
 
-    cal_service = do_google_credentials(token_json)
+    if cal_service is None:
+        cal_service = do_google_credentials(token_json)
+
+    if granularity == 'day':
+        sync_tide_day_events(cal_service, cal_name, json_data[0], cal_tide_data,
+                             sync_journal, read_only)
+        return
 
-    cal_tide_times_at_start = get_cal_tide_times(cal_service, cal_name)
+    tide_url = json_data[0]['meta_tide_url']
+    cal_tide_ids_at_start, legacy_times = get_cal_tide_event_ids(cal_service, cal_name,
+                                                                 tide_url)
+    if not cal_tide_ids_at_start:
+        # Station's first sync, tide events may have been added by an earlier
+        # version without deterministic IDs
+        legacy_events = get_legacy_tide_events(cal_service, cal_name, tide_url)
+        legacy_times.update(event_time_key(e['start']['dateTime']) for e in legacy_events)
+        if legacy_events and not read_only:
+            tag_legacy_tide_events(cal_service, cal_name, tide_url, legacy_events)
 
-    new_tide_data = get_new_tide_data(cal_tide_times_at_start, cal_tide_data)
+    new_tide_data = get_new_tide_data(cal_tide_ids_at_start, cal_tide_data, tide_url,
+                                      legacy_times, time_zone)
 
     new_tide_events = get_new_tide_events(json_data[0], new_tide_data)
 
     if len(new_tide_events) > 0:
         if not read_only:
-            add_cal_tide_events(cal_service, cal_name, new_tide_events)
+            add_cal_tide_events(cal_service, cal_name, new_tide_events, sync_journal)
             print(f"Tides events added to calendar '{cal_name}' = {len(new_tide_events)}")
         else:
             print(f"{__name__} called with --read-only=True - tide events NOT added " +
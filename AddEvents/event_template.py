@@ -0,0 +1,161 @@
+'''
+Precompiled Google calendar tide event template.
+
+Creates the same tide events as :func:`add_cal_events.get_new_tide_events`
+but does the work that is the same for every tide of a station once, when
+the template is created, rather than once per tide:
+
+ * the event description text is formatted once,
+ * the summary state and colour of high and low tides are looked up,
+ * the event ID hash is seeded with the station's tide URL,
+ * the station's tide URL is recorded in the event's private extended
+   property ``STATION_PROPERTY``, so a station's events can be listed
+   without listing the events of every other station in the calendar,
+ * the event end time is looked up from a table of the 1440 minutes of the
+   day rather than parsing and formatting the tide time with ``datetime``.
+
+E.g.::
+
+    template = TideEventTemplate(scrape_meta)
+    events = list(template.events(tide_data))
+
+Events may also be written as a JSON Lines request stream, one event per
+line, see :meth:`TideEventTemplate.write_jsonl`.
+'''
+
+import datetime
+import hashlib
+import json
+from typing import Iterator, TextIO
+
+# Duration of a tide event
+EVENT_MINUTES = 20
+
+# Private extended property of tide events holding the station's tide URL
+STATION_PROPERTY = 'tides2cal_station'
+
+# Event end time, 'HH:MM', keyed by start time 'HH:MM'. Start times whose end
+# time is on the next day are not in the table.
+_END_TIMES = {f"{m // 60:02d}:{m % 60:02d}":
+              f"{(m + EVENT_MINUTES) // 60:02d}:{(m + EVENT_MINUTES) % 60:02d}"
+              for m in range(24 * 60 - EVENT_MINUTES)}
+
+# Summary state and colour of tide events
+_HIGH = ('HIGH', 9) # blue
+_LOW = ('low', 11) # red
+
+def event_description(scrape_meta: dict, now_datetime: datetime.datetime) -> str:
+    '''
+    Return the description text of a station's tide events.
+
+    :param scrape_meta: Meta data about the scrape added to event descriptions.
+    :type scrape_meta: dict
+    :param now_datetime: Time events are being added to calendar.
+    :type now_datetime: datetime.datetime
+
+    :return: Event description
+    :rtype: str
+    '''
+    desc_time_str = f"{now_datetime.strftime('%a %d %b %Y')} at " + \
+                    f"{now_datetime.strftime('%H:%M')}"
+    tide_location = scrape_meta['meta_tide_location']
+    tide_url = scrape_meta['meta_tide_url']
+    scrape_datetime = datetime.datetime.fromisoformat(scrape_meta['meta_scrape_time'])
+    scrape_time_str = f"{scrape_datetime.strftime('%a %d %b %Y')} at " + \
+                      f"{scrape_datetime.strftime('%H:%M')}"
+    return f"<b>{tide_location}</b> tide event added by Tides2Cal on {desc_time_str}.<br>" +\
+           f"Tide data scraped on {scrape_time_str} from {tide_url}"
+# end event_description()
+
+class TideEventTemplate:
+    '''
+    Tide event template of a station.
+
+    :param scrape_meta: Meta data about the scrape added to event descriptions.
+    :type scrape_meta: dict
+    :param time_zone: Time zone of event times.
+    :type time_zone: str
+    :param now_datetime: Time events are being added to calendar, if None the \
+        time the template is created.
+    :type now_datetime: datetime.datetime
+    '''
+    def __init__(self, scrape_meta: dict, time_zone: str='Europe/London',
+                 now_datetime: datetime.datetime=None):
+        if now_datetime is None:
+            now_datetime = datetime.datetime.now()
+        self.description = event_description(scrape_meta, now_datetime)
+        self.time_zone = time_zone
+        self.tide_url = scrape_meta['meta_tide_url']
+        self._id_hash = hashlib.sha1(f"{scrape_meta['meta_tide_url']}|".encode('utf-8'))
+
+    def event(self, tide: dict) -> dict:
+        '''
+        Return Google calendar event of ``tide``.
+
+        :param tide: Tide data dictionary, an entry of the scraped ``tide_list``.
+        :type tide: dict
+
+        :return: Google calendar event
+        :rtype: dict
+        '''
+        date_time = tide['date_time']
+        state, color_id = _HIGH if tide['is_high'] else _LOW
+
+        end_time = _END_TIMES.get(date_time[11:16])
+        if end_time is not None:
+            end_date_time = f"{date_time[:11]}{end_time}{date_time[16:]}"
+        else:
+            # Event ends on the next day
+            end_datetime = datetime.datetime.fromisoformat(date_time) + \
+                datetime.timedelta(minutes=EVENT_MINUTES)
+            end_date_time = end_datetime.strftime('%Y-%m-%dT%H:%M:%S')
+
+        id_hash = self._id_hash.copy()
+        id_hash.update(date_time.encode('utf-8'))
+
+        return {
+            'id': id_hash.hexdigest(),
+            'summary': f"{tide['number']} tide {state} {tide['height']}",
+            'description': self.description,
+            'colorId': color_id,
+            'start': {
+                'dateTime': date_time,
+                'timeZone': self.time_zone,
+            },
+            'end': {
+                'dateTime': end_date_time,
+                'timeZone': self.time_zone,
+            },
+            'extendedProperties': {
+                'private': {STATION_PROPERTY: self.tide_url},
+            }
+        }
+    # end event()
+
+    def events(self, tide_data: list) -> Iterator[dict]:
+        '''
+        Yield Google calendar event of each tide in ``tide_data``.
+        '''
+        event = self.event
+        for tide in tide_data:
+            yield event(tide)
+
+    def write_jsonl(self, tide_data: list, jsonl_out: TextIO) -> int:
+        '''
+        Write Google calendar event of each tide in ``tide_data`` to
+        ``jsonl_out``, one JSON encoded event per line.
+
+        :return: Number of events written.
+        :rtype: int
+        '''
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        num_events = 0
+        for event in self.events(tide_data):
+            jsonl_out.write(encode(event))
+            jsonl_out.write('\n')
+            num_events += 1
+        return num_events
+
+# end class TideEventTemplate
+
+# end-of-file
@@ -0,0 +1,419 @@
+'''
+Scrape and sync tide stations using multiple worker processes.
+
+Station jobs are held in a shared SQLite queue. Any number of worker
+processes, on one host or on several hosts sharing a filesystem, claim jobs
+from the queue. A claimed job is *leased* to the worker for a limited time,
+the worker extends the lease with a heartbeat while it runs the job. If a
+worker dies the lease of its job expires and the job is automatically
+reclaimed by another worker, unless it has already been attempted
+``max_attempts`` times when it is marked failed. Should a worker's heartbeat
+find its lease has been lost the worker abandons the job, stopping its
+scrape and not adding any events, as the job now belongs to another worker.
+
+For each station claimed the worker scrapes the station's tide data, running
+``scrapy crawl tideschart``, and then adds the tide events to the station's
+Google calendar, as :mod:`add_cal_events`. Should a worker die part way
+through adding events the worker reclaiming the job resumes from the sync
+journal.
+
+Queue stations, either from a station index created by the
+``tideschart_stations`` spider or from a file listing one station URL path,
+optionally followed by a calendar name and time zone, per line (e.g. the
+stations due output by ``python -m GetTides.schedule``). Stations of the
+index whose time zone could not be resolved are reported and not queued, the
+time zone of those queued is passed to the scrape::
+
+    python AddEvents/station_worker.py enqueue -s data/stations.json -c <cal_name>
+
+Run 4 worker processes on this host until the queue is empty::
+
+    python AddEvents/station_worker.py work -w 4 -t <path_to_auth_token>.json
+
+Show the number of jobs in each state::
+
+    python AddEvents/station_worker.py status
+'''
+
+# Standard imports
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+# Third-parth imports
+import plac
+
+# Local imports
+import add_cal_events
+from logging_helper import setup_log
+
+# Python logger identifier, following initial set_up, retrieve logger using:
+#   log = logging.getLogger(MY_LOGGER)
+MY_LOGGER = __name__
+
+# Directory containing the scrapy project, i.e. scrapy.cfg
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class LeaseLostError(RuntimeError):
+    '''
+    Raised when a worker abandons a job because its lease has been lost.
+    '''
+
+class StationQueue:
+    '''
+    SQLite queue of station jobs with leases.
+
+    A job is in one of the states:
+
+     * ``queued`` - waiting to be claimed
+     * ``leased`` - claimed by a worker until ``lease_expires``, once the \
+        lease expires the job may be claimed again
+     * ``done`` - completed
+     * ``failed`` - failed ``max_attempts`` times
+
+    :param queue_db: Name of SQLite database file.
+    :type queue_db: str
+    :param lease_secs: Duration of a lease, and of each lease extension.
+    :type lease_secs: float
+    '''
+    def __init__(self, queue_db: str, lease_secs: float=600):
+        self.lease_secs = lease_secs
+        # Autocommit mode, transactions are begun explicitly when needed
+        self._db = sqlite3.connect(queue_db, timeout=60, isolation_level=None)
+        self._db.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                                station TEXT PRIMARY KEY,
+                                cal_name TEXT NOT NULL,
+                                time_zone TEXT,
+                                state TEXT NOT NULL,
+                                lease_owner TEXT,
+                                lease_expires REAL,
+                                attempts INTEGER NOT NULL DEFAULT 0,
+                                last_error TEXT,
+                                updated REAL NOT NULL)''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires)')
+        # Queues created before jobs had a time zone
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(jobs)')}
+        if 'time_zone' not in columns:
+            self._db.execute('ALTER TABLE jobs ADD COLUMN time_zone TEXT')
+
+    def close(self) -> None:
+        '''
+        Close the queue database connection.
+        '''
+        self._db.close()
+
+    def enqueue(self, station: str, cal_name: str, time_zone: str=None) -> None:
+        '''
+        Queue job for ``station``. A job already queued or leased for the
+        station is left as it is, a done or failed job is queued again.
+        If ``time_zone`` is None the station's time zone is resolved by the
+        scrape.
+        '''
+        self._db.execute('''INSERT INTO jobs (station, cal_name, time_zone, state, updated)
+                            VALUES (?, ?, ?, 'queued', ?)
+                            ON CONFLICT (station) DO UPDATE
+                            SET cal_name = excluded.cal_name,
+                                time_zone = excluded.time_zone, state = 'queued',
+                                attempts = 0, last_error = NULL,
+                                updated = excluded.updated
+                            WHERE state IN ('done', 'failed')''',
+                         (station, cal_name, time_zone, time.time()))
+
+    def claim(self, worker_id: str, max_attempts: int) -> tuple:
+        '''
+        Claim the oldest queued job, or a leased job whose lease has expired.
+        A job whose lease has expired that has already been attempted
+        ``max_attempts`` times, e.g. because it repeatedly kills its worker,
+        is marked failed rather than claimed.
+
+        :param worker_id: Identifier of claiming worker.
+        :type worker_id: str
+        :param max_attempts: Number of times a job is attempted before it is \
+            marked failed.
+        :type max_attempts: int
+
+        :return: Tuple ``(station, cal_name, time_zone)`` of claimed job, or \
+            None if there is no job to claim.
+        :rtype: tuple
+        '''
+        now = time.time()
+        # BEGIN IMMEDIATE takes the database write lock, so no other worker
+        # can claim the same job between the SELECT and UPDATE
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            self._db.execute('''UPDATE jobs SET state = 'failed', lease_owner = NULL,
+                                    lease_expires = NULL,
+                                    last_error = 'Lease expired on last attempt',
+                                    updated = ?
+                                WHERE state = 'leased' AND lease_expires < ?
+                                  AND attempts >= ?''', (now, now, max_attempts))
+            job = self._db.execute('''SELECT station, cal_name, time_zone FROM jobs
+                                      WHERE state = 'queued'
+                                         OR (state = 'leased' AND lease_expires < ?
+                                             AND attempts < ?)
+                                      ORDER BY updated LIMIT 1''',
+                                   (now, max_attempts)).fetchone()
+            if job is not None:
+                self._db.execute('''UPDATE jobs SET state = 'leased', lease_owner = ?,
+                                        lease_expires = ?, attempts = attempts + 1,
+                                        updated = ?
+                                    WHERE station = ?''',
+                                 (worker_id, now + self.lease_secs, now, job[0]))
+            self._db.execute('COMMIT')
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        return job
+    # end claim()
+
+    def heartbeat(self, station: str, worker_id: str) -> bool:
+        '''
+        Extend the lease of ``worker_id`` on the job of ``station``.
+
+        :return: False if the worker no longer holds the lease.
+        :rtype: bool
+        '''
+        cursor = self._db.execute('''UPDATE jobs SET lease_expires = ?
+                                     WHERE station = ? AND state = 'leased'
+                                       AND lease_owner = ?''',
+                                  (time.time() + self.lease_secs, station, worker_id))
+        return cursor.rowcount == 1
+
+    def complete(self, station: str, worker_id: str) -> None:
+        '''
+        Mark the job of ``station`` leased by ``worker_id`` as done.
+        '''
+        self._db.execute('''UPDATE jobs SET state = 'done', lease_owner = NULL,
+                                lease_expires = NULL, last_error = NULL, updated = ?
+                            WHERE station = ? AND lease_owner = ?''',
+                         (time.time(), station, worker_id))
+
+    def fail(self, station: str, worker_id: str, error: str, max_attempts: int) -> None:
+        '''
+        Release the job of ``station`` leased by ``worker_id`` following an
+        error. The job is queued again unless it has been attempted
+        ``max_attempts`` times.
+        '''
+        self._db.execute('''UPDATE jobs SET
+                                state = CASE WHEN attempts >= ? THEN 'failed'
+                                             ELSE 'queued' END,
+                                lease_owner = NULL, lease_expires = NULL,
+                                last_error = ?, updated = ?
+                            WHERE station = ? AND lease_owner = ?''',
+                         (max_attempts, error, time.time(), station, worker_id))
+
+    def status(self) -> dict:
+        '''
+        Return dictionary of the number of jobs in each state.
+        '''
+        return dict(self._db.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state'))
+
+# end class StationQueue
+
+def read_stations(stations_in: str, cal_name: str) -> list:
+    '''
+    Read stations to be queued.
+
+    :param stations_in: Either a station index JSON file, or a file listing \
+        one station URL path, optionally followed by a calendar name and time \
+        zone, per line.
+    :type stations_in: str
+    :param cal_name: Calendar name of stations not given a calendar name.
+    :type cal_name: str
+
+    :return: List of ``(station, cal_name, time_zone)`` tuples, ``time_zone`` \
+        None if not given.
+    :rtype: list
+    '''
+    log = logging.getLogger(MY_LOGGER)
+
+    stations = []
+    with open(stations_in, 'r') as stations_file:
+        if stations_in.endswith('.json'):
+            for station in json.load(stations_file)['stations'].values():
+                if 'time_zone' in station and station['time_zone'] is None:
+                    log.warning("Station '%s' has no time zone, not queued",
+                                station['url_path'])
+                    continue
+                stations.append((station['url_path'], station.get('cal_name', cal_name),
+                                 station.get('time_zone')))
+        else:
+            for line in stations_file:
+                fields = line.split()
+                if len(fields) == 0 or fields[0].startswith('#'):
+                    continue
+                stations.append((fields[0], fields[1] if len(fields) > 1 else cal_name,
+                                 fields[2] if len(fields) > 2 else None))
+    return stations
+# end read_stations()
+
+def run_station_job(station: str, cal_name: str, time_zone: str, token_json: str,
+                    read_only: bool, log_level: str,
+                    lease_lost: threading.Event=None) -> None:
+    '''
+    Scrape tide data of ``station`` and add its tide events to calendar
+    ``cal_name``. If ``time_zone`` is None it is resolved by the scrape.
+
+    If ``lease_lost`` is set whilst the job runs the scrape is stopped, or
+    if the scrape has completed no events are added, and
+    :class:`LeaseLostError` raised.
+    '''
+    log = logging.getLogger(MY_LOGGER)
+
+    data_dir = os.path.join(PROJECT_DIR, 'data')
+    if not os.path.isdir(data_dir):
+        data_dir = PROJECT_DIR
+    json_out = os.path.join(data_dir, 'tides_' + station.replace('/', '_') + '.json')
+
+    log.info("Scraping station '%s' to '%s'", station, json_out)
+    if lease_lost is None:
+        lease_lost = threading.Event()
+    scrape_args = [sys.executable, '-m', 'scrapy', 'crawl', 'tideschart',
+                   '-a', f'tide_url={station}', '-a', 'tolerant=True', '-O', json_out,
+                   '-L', 'INFO' if log_level in ('info', 'debug') else 'WARNING']
+    if time_zone is not None:
+        scrape_args += ['-a', f'time_zone={time_zone}']
+    with subprocess.Popen(scrape_args, cwd=PROJECT_DIR) as scrape:
+        while scrape.poll() is None:
+            if lease_lost.wait(1.0):
+                scrape.terminate()
+                scrape.wait()
+                break
+    if lease_lost.is_set():
+        raise LeaseLostError(f"Lease of station '{station}' lost, job abandoned")
+    if scrape.returncode != 0:
+        raise subprocess.CalledProcessError(scrape.returncode, scrape.args)
+
+    add_cal_events.main(cal_name=cal_name, token_json=token_json, json_in=json_out,
+                        read_only=read_only, log=log_level)
+# end run_station_job()
+
+def work(queue_db: str, lease_secs: float, max_attempts: int, token_json: str,
+         read_only: bool, log_level: str) -> int:
+    '''
+    Claim and run station jobs until the queue has no job to claim.
+
+    :return: Number of jobs completed.
+    :rtype: int
+    '''
+    log = setup_log(MY_LOGGER, log_level)
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    queue = StationQueue(queue_db, lease_secs)
+    completed = 0
+
+    while True:
+        job = queue.claim(worker_id, max_attempts)
+        if job is None:
+            break
+        station, cal_name, time_zone = job
+        log.info("Worker %s claimed station '%s'", worker_id, station)
+
+        # Heartbeat, using its own connection, extends the lease whilst the
+        # job runs and signals the job to be abandoned if the lease is lost
+        stop = threading.Event()
+        lease_lost = threading.Event()
+        def heartbeat(station=station):
+            hb_queue = StationQueue(queue_db, lease_secs)
+            while not stop.wait(lease_secs / 3):
+                if not hb_queue.heartbeat(station, worker_id):
+                    log.warning("Worker %s lost lease of station '%s'", worker_id, station)
+                    lease_lost.set()
+                    break
+            hb_queue.close()
+        hb_thread = threading.Thread(target=heartbeat, daemon=True)
+        hb_thread.start()
+
+        try:
+            run_station_job(station, cal_name, time_zone, token_json, read_only,
+                            log_level, lease_lost)
+        except LeaseLostError as exc:
+            # The job now belongs to another worker, so is left as it is
+            log.warning("Worker %s: %s", worker_id, exc)
+        except Exception as exc:
+            log.error("Worker %s station '%s' failed: %s", worker_id, station, exc)
+            queue.fail(station, worker_id, traceback.format_exc(), max_attempts)
+        else:
+            queue.complete(station, worker_id)
+            completed += 1
+        finally:
+            stop.set()
+            hb_thread.join()
+
+    queue.close()
+    log.info("Worker %s found no more jobs, %d completed", worker_id, completed)
+    return completed
+# end work()
+
+@plac.pos('command', "Command to run.", choices=['enqueue', 'work', 'status'])
+@plac.opt('queue_db', "SQLite station job queue shared by all workers.", type=str)
+@plac.opt('stations_in', "enqueue: station index JSON file, or file listing a " + \
+          "station URL path and optional calendar name and time zone per line.",
+          type=str)
+@plac.opt('cal_name', "enqueue: Google calendar name of stations not given one.",
+          type=str)
+@plac.opt('workers', "work: number of worker processes to run on this host.", type=int)
+@plac.opt('lease_secs', "work: seconds a claimed job is leased for before it " + \
+          "may be reclaimed, extended by heartbeat whilst job runs.", type=float,
+          abbrev='L')
+@plac.opt('max_attempts', "work: number of times a job is attempted before " + \
+          "it is marked failed.", type=int)
+@plac.opt('token_json', "work: user's Google calendar access and refresh tokens.",
+          type=str)
+@plac.opt('read_only', "work: when True do NOT create new calendar tide events.",
+          type=bool)
+@plac.opt('log', "Set logging level.", type=str,
+          choices=['off', 'info', 'debug'])
+def main(command: str, queue_db: str='data/station_queue.db',
+         stations_in: str='data/stations.json', cal_name: str='primary',
+         workers: int=1, lease_secs: float=600, max_attempts: int=3,
+         token_json: str='cal_token.json', read_only: bool=False, log: str='off'):
+    '''
+    Queue station jobs, or run workers scraping and syncing queued stations.
+    '''
+    log_level = log
+    setup_log(MY_LOGGER, log_level)
+
+    if command == 'enqueue':
+        queue = StationQueue(queue_db, lease_secs)
+        stations = read_stations(stations_in, cal_name)
+        for station, station_cal_name, time_zone in stations:
+            queue.enqueue(station, station_cal_name, time_zone)
+        print(f"Stations queued from '{stations_in}' = {len(stations)}")
+        queue.close()
+    elif command == 'work':
+        # Jobs are claimed by each process so the processes share nothing but
+        # the queue database
+        args = (queue_db, lease_secs, max_attempts, token_json, read_only, log_level)
+        if workers == 1:
+            work(*args)
+        else:
+            processes = [multiprocessing.Process(target=work, args=args)
+                         for _ in range(workers)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+    queue = StationQueue(queue_db, lease_secs)
+    print(f"Station jobs: {queue.status()}")
+    queue.close()
+
+# end main()
+
+if __name__ == '__main__':
+    try:
+        plac.call(main)
+    except Exception as exc:
+        print("Exception executing " + os.path.basename(__file__) +
+              f" main() Exception: {exc}")
+        print(traceback.format_exc())
+
+# end-of-file
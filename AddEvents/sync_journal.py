@@ -0,0 +1,184 @@
+'''
+Write-ahead journal of the calendar operations of a tide event sync.
+
+Before any calendar operation of a sync run is executed every planned
+operation is written to the journal, as each operation completes this is
+also recorded. Should the run die part way through, e.g. following a network
+drop or quota error, the next run reads the operations still to be completed
+from the journal and continues from there without having to list the
+calendar and recompute the tide events again. Once all operations complete
+the journal is removed.
+
+The journal is a JSON Lines file, one record per line. E.g.::
+
+    {"op": "plan", "calendar_id": "primary", "method": "insert", "event_id": "3f0c...", "body": {...}}
+    {"op": "plan", "calendar_id": "primary", "method": "insert", "event_id": "9a41...", "body": {...}}
+    {"op": "planned", "calendar_id": "primary"}
+    {"op": "done", "event_id": "3f0c..."}
+
+The ``planned`` record marks the plan as complete, a journal without it is
+from a run that died whilst writing the plan, before any operation was
+executed, and is discarded. Each record is flushed to disk before the
+operation it records proceeds.
+
+Calendar events are inserted with a deterministic event ID, see
+:func:`tide_event_id`, so that replaying an insert that completed but was not
+recorded as done fails with ``409 Conflict`` rather than creating a duplicate
+event.
+'''
+
+import hashlib
+import json
+import logging
+import os
+import re
+
+# Python logger identifier
+MY_LOGGER = __name__
+
+def tide_event_id(tide_url: str, event_time: str) -> str:
+    '''
+    Return deterministic Google calendar event ID for the tide event of the
+    tide location at ``tide_url`` starting at ``event_time``.
+
+    Google calendar event IDs may only contain characters in the base32hex
+    encoding, i.e. lowercase letters a-v and digits 0-9, so a hex digest is
+    a valid ID.
+
+    :param tide_url: URL tide data was scraped from.
+    :type tide_url: str
+    :param event_time: Event start time or date, e.g. ``2021-06-10T03:32:00``
+    :type event_time: str
+
+    :return: Event ID
+    :rtype: str
+    '''
+    return hashlib.sha1(f"{tide_url}|{event_time}".encode('utf-8')).hexdigest()
+# end tide_event_id()
+
+# Form of the IDs created by tide_event_id()
+_TIDE_EVENT_ID = re.compile('[0-9a-f]{40}')
+
+def is_tide_event_id(event_id: str) -> bool:
+    '''
+    Return True if ``event_id`` has the form of an ID created by
+    :func:`tide_event_id`, i.e. the event was created by tides2cal. Event IDs
+    generated by Google calendar are not 40 hex digits.
+    '''
+    return _TIDE_EVENT_ID.fullmatch(event_id) is not None
+
+class SyncJournal:
+    '''
+    Write-ahead journal of a sync run's calendar operations.
+
+    :param journal_file: Name of journal file.
+    :type journal_file: str
+    '''
+    def __init__(self, journal_file: str):
+        self.journal_file = journal_file
+        self._journal = None
+
+    def pending(self, calendar_id: str) -> list:
+        '''
+        Return the operations planned for ``calendar_id`` by a previous run
+        that have not been completed.
+
+        :param calendar_id: Google calendar id.
+        :type calendar_id: str
+
+        :return: List of ``(method, event_id, body)`` tuples, empty if there \
+            is no complete plan for the calendar in the journal.
+        :rtype: list
+        '''
+        log = logging.getLogger(MY_LOGGER)
+
+        if not os.path.exists(self.journal_file):
+            return []
+
+        planned = {}
+        done = set()
+        plan_complete = False
+        with open(self.journal_file, 'r') as journal:
+            for line_num, line in enumerate(journal, 1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be truncated if the run died writing it
+                    log.warning("Ignoring unreadable line %d of journal '%s'",
+                                line_num, self.journal_file)
+                    continue
+                if record['op'] == 'plan' and record['calendar_id'] == calendar_id:
+                    planned[record['event_id']] = (record['method'], record['event_id'],
+                                                   record['body'])
+                elif record['op'] == 'planned' and record['calendar_id'] == calendar_id:
+                    plan_complete = True
+                elif record['op'] == 'done':
+                    done.add(record['event_id'])
+
+        if not plan_complete:
+            log.warning("Journal '%s' has no complete plan for calendar '%s' - ignored",
+                        self.journal_file, calendar_id)
+            return []
+
+        return [op for event_id, op in planned.items() if event_id not in done]
+    # end pending()
+
+    def plan(self, calendar_id: str, operations: list) -> None:
+        '''
+        Start a new journal recording the planned operations.
+
+        :param calendar_id: Google calendar id operations are for.
+        :type calendar_id: str
+        :param operations: List of ``(method, event_id, body)`` tuples.
+        :type operations: list
+        '''
+        self.close()
+        self._journal = open(self.journal_file, 'w')
+        for method, event_id, body in operations:
+            self._write({'op': 'plan', 'calendar_id': calendar_id, 'method': method,
+                         'event_id': event_id, 'body': body}, sync=False)
+        self._write({'op': 'planned', 'calendar_id': calendar_id})
+    # end plan()
+
+    def resume(self) -> None:
+        '''
+        Open existing journal to record completion of pending operations.
+        '''
+        self.close()
+        self._journal = open(self.journal_file, 'a')
+
+    def done(self, event_id: str) -> None:
+        '''
+        Record operation on event ``event_id`` as completed.
+        '''
+        self._write({'op': 'done', 'event_id': event_id})
+
+    def complete(self) -> None:
+        '''
+        All planned operations are completed, remove the journal.
+        '''
+        self.close()
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+
+    def close(self) -> None:
+        '''
+        Close the journal file, if open.
+        '''
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _write(self, record: dict, sync: bool=True) -> None:
+        '''
+        Append record to journal, when ``sync`` is True ensure it, and all
+        records before it, are on disk before returning.
+        '''
+        self._journal.write(json.dumps(record) + '\n')
+        if sync:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+# end class SyncJournal
+
+# end-of-file
@@ -0,0 +1,72 @@
+"""
+Item pipelines of the GetTides Scrapy project, see
+https://docs.scrapy.org/en/latest/topics/item-pipeline.html
+"""
+
+# Standard modules
+import datetime
+
+# Third-party modules
+from scrapy.exceptions import NotConfigured
+
+# Local modules
+from GetTides.schedule import ScrapeSchedule
+from GetTides.spiders.tideschart import DRIFT_MIN_CELLS
+
+
+class ScheduleRecordPipeline:
+    '''
+    Record each station scraped by the tideschart spider in the scrape
+    schedule, see :mod:`GetTides.schedule`. The schedule file is given by the
+    ``TIDES_SCHEDULE_FILE`` setting, the pipeline is disabled when the setting
+    is empty.
+
+    The tide table cells parsed, and that failed to parse, are also recorded.
+    When the spider closes an error is logged if, over all stations fetched
+    in the last 24 hours, the proportion of cells that failed to parse reaches
+    the spider's ``drift_threshold``.
+    '''
+    def __init__(self, schedule_json: str):
+        self.schedule_json = schedule_json
+        self.schedule = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        schedule_json = crawler.settings.get('TIDES_SCHEDULE_FILE')
+        if not schedule_json:
+            raise NotConfigured('TIDES_SCHEDULE_FILE not set')
+        return cls(schedule_json)
+
+    def open_spider(self, spider):
+        self.schedule = ScrapeSchedule(self.schedule_json)
+
+    def close_spider(self, spider):
+        # Saving re-reads the schedule, so includes the scrapes of other processes
+        self.schedule.save()
+        if not hasattr(spider, 'drift_threshold'):
+            return
+        cells_failed, num_cells = self.schedule.cell_counts(
+            datetime.datetime.now(datetime.timezone.utc))
+        spider.crawler.stats.set_value('tideschart/crawl_cells_failed', cells_failed)
+        spider.crawler.stats.set_value('tideschart/crawl_cells', num_cells)
+        if num_cells >= DRIFT_MIN_CELLS and cells_failed / num_cells >= spider.drift_threshold:
+            spider.logger.error("Markup drift suspected: %d of %d tide cells (%.0f%%) " +
+                                "of stations scraped in the last 24 hours failed to parse",
+                                cells_failed, num_cells, 100 * cells_failed / num_cells)
+
+    def process_item(self, item, spider):
+        '''
+        The last item produced by the tideschart spider for a station contains
+        the ``tide_list``, record the fetch on receipt of this.
+        '''
+        if 'tide_list' in item and hasattr(spider, 'station_path'):
+            changed = self.schedule.record_fetch(spider.station_path, item['tide_list'],
+                                                 datetime.datetime.now(datetime.timezone.utc),
+                                                 getattr(spider, 'time_zone', None))
+            self.schedule.record_cells(spider.station_path, spider.cells_parsed,
+                                       len(spider.bad_cells))
+            spider.logger.info("Scrape of '%s' recorded in schedule, page changed: %s",
+                               spider.station_path, changed)
+        return item
+
+# end class ScheduleRecordPipeline
@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+"""
+Freshness driven scrape scheduler.
+
+Rather than re-scraping every station on a fixed cron the schedule records,
+per station:
+
+ * when the station's tideschart page was last fetched,
+ * how often the page's content was found to have changed between fetches,
+ * the *horizon*, i.e. the time of the last future tide already held.
+
+A station is *due* to be scraped, once at least ``min_refetch_hours`` hours
+have passed since it was last fetched, when either:
+
+ 1. the horizon is less than ``min_horizon_days`` days away, so calendars
+    are kept at least this many days deep, or
+ 2. the estimated probability that the page has changed since it was last
+    fetched, multiplied by the station's priority, is at least
+    ``change_threshold``.
+
+The probability of change is estimated treating page changes as a Poisson
+process, with the change rate estimated from the number of changes observed
+over the time the station has been watched::
+
+    rate = (changes + 1) / (watched_hours + PRIOR_HOURS)
+    p_changed = 1 - exp(-rate * hours_since_fetch)
+
+A fetch is counted as a change when the tides of any day present in both
+the previous and the latest fetch differ, in time, height or state. Days
+simply rolling into the forecast window are not a change.
+
+Tide times, and so the horizon, are local times of the station, in its time
+zone. Fetch times are recorded in UTC.
+
+The number of tide table cells parsed, and that failed to parse, by each
+station's latest scrape are also recorded so that the proportion of cells
+failing to parse can be monitored across a crawl of many stations, each
+scraped by its own process, see :meth:`ScrapeSchedule.cell_counts`.
+
+The schedule is stored in a JSON file, by default ``data/schedule.json``,
+that is updated by the :class:`GetTides.pipelines.ScheduleRecordPipeline`
+item pipeline each time the tideschart spider scrapes a station. To list the
+stations in the station index that are due to be scraped::
+
+    python -m GetTides.schedule -i data/stations.json
+
+E.g. to scrape only the stations that are due::
+
+    for station in $(python -m GetTides.schedule); do
+        scrapy crawl tideschart -a tide_url=$station -O data/tides_${station//\\//_}.json
+    done
+"""
+
+# Standard modules
+import datetime
+import fcntl
+import json
+import logging
+import math
+import os
+import zoneinfo
+
+# Third-party modules
+import plac
+
+# Local modules
+from GetTides.spiders.stations import load_station_index
+
+# Number of days of tides on a station's tideschart page. When fetched, the
+# page's last tide is between PAGE_DAYS - 1 and PAGE_DAYS days away.
+PAGE_DAYS = 7
+
+# Default schedule thresholds. The horizon threshold is well inside the page
+# window so that a fetch is not due again as soon as it has been made.
+MIN_HORIZON_DAYS = PAGE_DAYS - 2.0
+CHANGE_THRESHOLD = 0.5
+MIN_REFETCH_HOURS = 12.0
+
+# Hours of watching assumed, with one change, before a station's first
+# change is observed. Avoids a rate of 0 for a newly watched station.
+PRIOR_HOURS = 24.0 * 7
+
+
+def _aware(date_time: datetime.datetime) -> datetime.datetime:
+    '''
+    Return ``date_time`` with a time zone, a naive time is taken to be the
+    host's local time.
+    '''
+    return date_time if date_time.tzinfo is not None else date_time.astimezone()
+
+
+class ScrapeSchedule:
+    '''
+    Per station scrape history, used to decide which stations are due to be
+    scraped.
+
+    :param schedule_json: Name of the JSON file the schedule is stored in.
+    :type schedule_json: str
+    :param min_horizon_days: A station is due when its horizon is fewer than \
+        this many days away.
+    :type min_horizon_days: float
+    :param change_threshold: A station is due when its probability of change \
+        multiplied by its priority is at least this.
+    :type change_threshold: float
+    :param min_refetch_hours: A station is never due within this many hours \
+        of its last fetch.
+    :type min_refetch_hours: float
+    '''
+    def __init__(self, schedule_json: str,
+                 min_horizon_days: float = MIN_HORIZON_DAYS,
+                 change_threshold: float = CHANGE_THRESHOLD,
+                 min_refetch_hours: float = MIN_REFETCH_HOURS):
+        self.schedule_json = schedule_json
+        self.min_horizon_days = min_horizon_days
+        self.change_threshold = change_threshold
+        self.min_refetch_hours = min_refetch_hours
+        self.stations = {}
+        self._updated = set()
+        self.load()
+
+    def load(self) -> None:
+        '''
+        Read the schedule from file, if the file exists.
+        '''
+        if os.path.exists(self.schedule_json):
+            with open(self.schedule_json, 'r') as schedule_file:
+                self.stations = json.load(schedule_file)
+
+    def save(self) -> None:
+        '''
+        Write the stations updated by :meth:`record_fetch` to file. The file
+        is locked and re-read first so that schedules updated by concurrent
+        scrapes of other stations are not lost.
+        '''
+        if not self._updated:
+            return
+        with open(self.schedule_json + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            updated = {s: self.stations[s] for s in self._updated}
+            self.load()
+            self.stations.update(updated)
+            tmp_json = self.schedule_json + '.tmp'
+            with open(tmp_json, 'w') as schedule_file:
+                json.dump(self.stations, schedule_file, indent=1, sort_keys=True)
+            os.replace(tmp_json, self.schedule_json)
+        self._updated.clear()
+    # end save()
+
+    def record_fetch(self, station: str, tide_list: list,
+                     fetch_time: datetime.datetime, time_zone: str = None) -> bool:
+        '''
+        Record that ``station`` has been scraped.
+
+        :param station: Station URL path, e.g. \
+            ``United-Kingdom/Scotland/Edinburgh/Dalgety-Bay-Beach``
+        :type station: str
+        :param tide_list: The ``tide_list`` scraped, as output by the \
+            tideschart spider.
+        :type tide_list: list
+        :param fetch_time: Time station page was fetched, a naive time is \
+            taken to be the host's local time.
+        :type fetch_time: datetime.datetime
+        :param time_zone: Time zone of the station's tide times, if None the \
+            host's local time zone.
+        :type time_zone: str
+
+        :return: ``True`` if the page content changed since the last fetch.
+        :rtype: bool
+        '''
+        # Each day's tides, in page order, e.g. {'2021-06-10': ['03:32 5.28m u', ...]}
+        days = {}
+        for tide in tide_list:
+            days.setdefault(tide['date_time'][:10], []).append(
+                f"{tide['date_time'][11:16]} {tide['height']} {'u' if tide['is_high'] else 'd'}")
+        fetch_time = _aware(fetch_time).astimezone(datetime.timezone.utc)
+        entry = self.stations.get(station)
+        changed = False
+        if entry is not None:
+            last_fetch = _aware(datetime.datetime.fromisoformat(entry['last_fetch']))
+            entry['watched_hours'] += (fetch_time - last_fetch).total_seconds() / 3600
+            # Only days present in both fetches tell us if the page changed, a
+            # tide whose time is revised changes its day's tides
+            changed = any(days[d] != v for d, v in entry.get('days', {}).items() if d in days)
+            if changed:
+                entry['changes'] += 1
+        else:
+            entry = {'watched_hours': 0.0, 'changes': 0, 'priority': 1.0}
+            self.stations[station] = entry
+
+        entry['last_fetch'] = fetch_time.isoformat(timespec='seconds')
+        entry.pop('tides', None)
+        entry['days'] = days
+        entry['time_zone'] = time_zone
+        if tide_list:
+            entry['horizon'] = max(t['date_time'] for t in tide_list)
+        self._updated.add(station)
+
+        return changed
+    # end record_fetch()
+
+    def record_cells(self, station: str, cells_parsed: int, cells_failed: int) -> None:
+        '''
+        Record the number of tide table cells parsed, and that failed to
+        parse, by the latest scrape of ``station``.
+        '''
+        if station in self.stations:
+            self.stations[station]['cells'] = [cells_parsed, cells_failed]
+            self._updated.add(station)
+
+    def cell_counts(self, now: datetime.datetime, hours: float = 24.0) -> tuple:
+        '''
+        Return the number of tide table cells that failed to parse, and the
+        total number of cells, over the stations fetched within ``hours``
+        hours of ``now``.
+
+        :return: ``(cells_failed, num_cells)``
+        :rtype: tuple
+        '''
+        cells_failed = num_cells = 0
+        for station, entry in self.stations.items():
+            if 'cells' not in entry or self.hours_since_fetch(station, now) > hours:
+                continue
+            cells_failed += entry['cells'][1]
+            num_cells += sum(entry['cells'])
+        return cells_failed, num_cells
+
+    def set_priority(self, station: str, priority: float) -> None:
+        '''
+        Set the priority of ``station``, stations of higher priority are
+        scraped at a lower probability of change.
+        '''
+        if station in self.stations:
+            self.stations[station]['priority'] = priority
+            self._updated.add(station)
+
+    def horizon_days(self, station: str, now: datetime.datetime) -> float:
+        '''
+        Return the number of days until the last tide held for ``station``.
+        '''
+        entry = self.stations[station]
+        horizon = entry.get('horizon')
+        if horizon is None:
+            return 0.0
+        horizon_time = datetime.datetime.fromisoformat(horizon)
+        if entry.get('time_zone'):
+            horizon_time = horizon_time.replace(tzinfo=zoneinfo.ZoneInfo(entry['time_zone']))
+        else:
+            horizon_time = _aware(horizon_time)
+        return (horizon_time - _aware(now)).total_seconds() / (3600 * 24)
+
+    def hours_since_fetch(self, station: str, now: datetime.datetime) -> float:
+        '''
+        Return the number of hours since ``station`` was last fetched.
+        '''
+        last_fetch = _aware(datetime.datetime.fromisoformat(self.stations[station]['last_fetch']))
+        return max((_aware(now) - last_fetch).total_seconds() / 3600, 0.0)
+
+    def change_probability(self, station: str, now: datetime.datetime) -> float:
+        '''
+        Return the estimated probability that the page of ``station`` has
+        changed since it was last fetched.
+        '''
+        entry = self.stations[station]
+        hours_since_fetch = self.hours_since_fetch(station, now)
+        rate = (entry['changes'] + 1) / (entry['watched_hours'] + PRIOR_HOURS)
+        return 1.0 - math.exp(-rate * hours_since_fetch)
+
+    def due_reason(self, station: str, now: datetime.datetime,
+                   priority: float = None) -> str:
+        '''
+        Return why ``station`` is due to be scraped, or None if it is not.
+
+        :param station: Station URL path.
+        :type station: str
+        :param now: Time to evaluate the schedule at.
+        :type now: datetime.datetime
+        :param priority: Station priority, if None the priority recorded in \
+            the schedule is used.
+        :type priority: float
+
+        :return: One of ``'new'``, ``'horizon'`` or ``'changed'``, or None.
+        :rtype: str
+        '''
+        if station not in self.stations:
+            return 'new'
+        if self.hours_since_fetch(station, now) < self.min_refetch_hours:
+            return None
+        if self.horizon_days(station, now) < self.min_horizon_days:
+            return 'horizon'
+        if priority is None:
+            priority = self.stations[station].get('priority', 1.0)
+        if self.change_probability(station, now) * priority >= self.change_threshold:
+            return 'changed'
+        return None
+    # end due_reason()
+
+    def due_stations(self, stations: list, now: datetime.datetime) -> list:
+        '''
+        Return the stations from ``stations`` that are due to be scraped,
+        those furthest from meeting the horizon first.
+        '''
+        due = [s for s in stations if self.due_reason(s, now) is not None]
+        return sorted(due, key=lambda s: self.horizon_days(s, now)
+                      if s in self.stations else -math.inf)
+
+# end class ScrapeSchedule
+
+
+def default_schedule_file() -> str:
+    '''
+    Return the default schedule file name, in the ``data`` directory if this
+    is present, otherwise in the current directory.
+    '''
+    if os.path.isdir('data'):
+        return 'data/schedule.json'
+    return 'schedule.json'
+
+
+@plac.opt('schedule_json', "Schedule JSON file updated when stations are scraped.",
+          type=str)
+@plac.opt('index_json', "Station index JSON file, listing stations to " + \
+          "consider.", type=str)
+@plac.opt('min_horizon_days', "Stations holding fewer than this many days of " + \
+          "future tides are due.", type=float)
+@plac.opt('change_threshold', "Stations whose probability of change, times " + \
+          "priority, is at least this are due.", type=float)
+@plac.opt('min_refetch_hours', "Stations fetched fewer than this many hours " + \
+          "ago are never due.", type=float, abbrev='r')
+@plac.opt('log', "Set logging level.", type=str,
+          choices=['off', 'info', 'debug'])
+def main(schedule_json: str=None, index_json: str=None,
+         min_horizon_days: float=MIN_HORIZON_DAYS,
+         change_threshold: float=CHANGE_THRESHOLD,
+         min_refetch_hours: float=MIN_REFETCH_HOURS, log: str='off'):
+    '''
+    Print the URL paths of stations due to be scraped, one per line.
+    '''
+    logging.basicConfig(level=logging.DEBUG if log == 'debug' else
+                        logging.INFO if log == 'info' else logging.WARNING,
+                        format='%(levelname)s: %(message)s')
+    log = logging.getLogger(__name__)
+
+    schedule = ScrapeSchedule(schedule_json if schedule_json else default_schedule_file(),
+                              min_horizon_days, change_threshold, min_refetch_hours)
+    if index_json is not None:
+        stations = list(load_station_index(index_json)['stations'])
+    else:
+        stations = list(schedule.stations)
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for station in schedule.due_stations(stations, now):
+        log.info("Station due (%s): %s", schedule.due_reason(station, now), station)
+        print(station)
+
+# end main()
+
+if __name__ == '__main__':
+    plac.call(main)
+
+# end-of-file
@@ -62,9 +62,13 @@ COOKIES_ENABLED = False
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
-#ITEM_PIPELINES = {
-#    'GetTides.pipelines.GettidesPipeline': 300,
-#}
+ITEM_PIPELINES = {
+    'GetTides.pipelines.ScheduleRecordPipeline': 300,
+}
+
+# Scrape schedule updated by ScheduleRecordPipeline, see GetTides/schedule.py.
+# Set empty to disable recording scrapes in the schedule
+TIDES_SCHEDULE_FILE = 'data/schedule.json'
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
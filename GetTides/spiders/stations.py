@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+"""
+A spider to discover the tide stations listed on http://tideschart.com/.
+
+The tideschart web site is organised as a hierarchy of pages::
+
+    <country>/<region>/<area>/<location>
+
+e.g. ``United-Kingdom/Scotland/Edinburgh/Dalgety-Bay-Beach``. Starting from
+the web site's home page the spider crawls the *country*, *region* and *area*
+pages breadth-first and records every *location* (tide station) linked from
+an area page in a local station index. Location pages themselves are never
+downloaded, the station details are taken from the links to them.
+
+The station index is a JSON file (by default ``data/stations.json`` if the
+``data`` directory is present) containing a dictionary::
+
+    {'stations': {'United-Kingdom/Scotland/Edinburgh/Dalgety-Bay-Beach':
+                     {'name': 'Dalgety Bay Beach',
+                      'url_path': 'United-Kingdom/Scotland/Edinburgh/Dalgety-Bay-Beach',
+                      'region': 'United-Kingdom/Scotland/Edinburgh',
+                      'time_zone': 'Europe/London'},
+                  ...},
+     'pages': {'United-Kingdom/Scotland/Edinburgh':
+                   {'etag': '"5d8c72a5edda8"',
+                    'last_modified': 'Thu, 10 Jun 2021 20:11:06 GMT',
+                    'children': ['United-Kingdom/Scotland/Edinburgh/Dalgety-Bay-Beach',
+                                 ...]},
+               ...}}
+
+The ``url_path`` of a station is the value to pass to the ``tide_url``
+argument of the tideschart spider. The ``time_zone`` of a station is null if
+it cannot be resolved from its URL path, see :mod:`GetTides.timezones`.
+
+**Resuming an interrupted crawl.** The crawl frontier and the request dedupe
+state are persisted by Scrapy when a job directory is given, the station
+index is also checkpointed to disk as the crawl progresses. Stopping the
+crawl (a single Ctrl-C) and re-running the same command continues from where
+it stopped::
+
+    scrapy crawl tideschart_stations -s JOBDIR=data/stations_job
+
+**Incremental re-discovery.** When the station index already exists each
+index page is requested with the ``If-None-Match``/``If-Modified-Since``
+validators saved from the previous crawl. A page that has not changed is
+answered ``304 Not Modified`` and its previously recorded child links are
+reused without downloading or parsing it again, only changed pages are
+re-parsed. Stations, and whole areas, regions or countries, no longer linked
+from a re-parsed page are removed from the index. Use ``-a incremental=False`` to ignore the saved validators and
+re-discover every page.
+"""
+
+# Standard modules
+import json
+import os
+from typing import Iterator
+from urllib.parse import urlparse
+
+# Third-party modules
+import scrapy
+
+# Local modules
+from GetTides.spiders.tideschart import TIDESCHART_WEB_SITE
+from GetTides.timezones import resolve_time_zone
+
+# Number of path segments in a location (tide station) URL path, i.e.
+#   <country>/<region>/<area>/<location>
+STATION_PATH_DEPTH = 4
+
+
+def default_station_index() -> str:
+    '''
+    Return the default station index file name, in the ``data`` directory if
+    this is present, otherwise in the current directory.
+    '''
+    if os.path.isdir('data'):
+        return 'data/stations.json'
+    return 'stations.json'
+# end default_station_index()
+
+
+def load_station_index(index_json: str) -> dict:
+    '''
+    Read a station index written by :class:`TideschartStationsSpider`.
+
+    :param index_json: Name of station index JSON file.
+    :type index_json: str
+
+    :return: Station index dictionary with keys ``stations`` and ``pages``, \
+        both empty if ``index_json`` does not exist.
+    :rtype: dict
+    '''
+    index = {'stations': {}, 'pages': {}}
+    if os.path.exists(index_json):
+        with open(index_json, 'r') as index_file:
+            index.update(json.load(index_file))
+    return index
+# end load_station_index()
+
+
+def save_station_index(index_json: str, index: dict) -> None:
+    '''
+    Write station index to file. The index is written to a temporary file
+    that then replaces ``index_json`` so an interrupted write never leaves a
+    truncated index behind.
+
+    :param index_json: Name of station index JSON file.
+    :type index_json: str
+    :param index: Station index dictionary.
+    :type index: dict
+    '''
+    tmp_json = index_json + '.tmp'
+    with open(tmp_json, 'w') as index_file:
+        json.dump(index, index_file, indent=1, sort_keys=True)
+    os.replace(tmp_json, index_json)
+# end save_station_index()
+
+
+class TideschartStationsSpider(scrapy.Spider):
+    """
+    Scrapy Spider class crawling the tideschart country, region and area
+    pages breadth-first to build the station index.
+    """
+    name = 'tideschart_stations'
+    allowed_domains = ['tideschart.com']
+
+    # Crawl breadth-first, see
+    # https://docs.scrapy.org/en/latest/faq.html#does-scrapy-crawl-in-breadth-first-or-depth-first-order
+    custom_settings = {
+        'DEPTH_PRIORITY': 1,
+        'SCHEDULER_DISK_QUEUE': 'scrapy.squeues.PickleFifoDiskQueue',
+        'SCHEDULER_MEMORY_QUEUE': 'scrapy.squeues.FifoMemoryQueue',
+    }
+
+    # Unchanged pages are answered 304 when requested with validators
+    handle_httpstatus_list = [304]
+
+    # pylint: disable=keyword-arg-before-vararg
+    def __init__(self,
+                 index_json: str = None,
+                 incremental: str = 'True',
+                 checkpoint_pages: str = '50',
+                 site_url: str = TIDESCHART_WEB_SITE,
+                 *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.index_json = index_json if index_json else default_station_index()
+        # Convert args from str
+        self.incremental = incremental.lower() == 'true'
+        self.checkpoint_pages = int(checkpoint_pages)
+        if not site_url.endswith('/'):
+            site_url += '/'
+        if site_url != TIDESCHART_WEB_SITE:
+            self.allowed_domains = [urlparse(site_url).hostname]
+        self.site_url = site_url
+
+        self.index = load_station_index(self.index_json)
+        self._pages_since_checkpoint = 0
+
+    def start_requests(self):
+        yield self._index_request('')
+
+    def parse(self, response: scrapy.http.TextResponse, **kwargs):
+        '''
+        Override :meth:`scrapy.Spider.parse` accepting a country, region or
+        area index page and following the links to the next level down the
+        hierarchy.
+        '''
+        path = response.meta['index_path']
+        page = self.index['pages'].get(path, {})
+
+        if response.status == 304:
+            self.logger.debug("Index page not modified: '%s'", path)
+            self.crawler.stats.inc_value('stations/pages_not_modified')
+            children = page.get('children', [])
+        else:
+            self.crawler.stats.inc_value('stations/pages_parsed')
+            children = self._get_child_paths(path, response)
+            self.index['pages'][path] = {
+                'etag': self._header(response, b'ETag'),
+                'last_modified': self._header(response, b'Last-Modified'),
+                'children': children
+            }
+
+        depth = TideschartStationsSpider._path_depth(path) + 1
+        if depth == STATION_PATH_DEPTH and response.status != 304:
+            self._rm_stations(path, children)
+        elif response.status != 304:
+            for child in page.get('children', []):
+                if child not in children:
+                    self._rm_subtree(child)
+        for child in children:
+            if depth == STATION_PATH_DEPTH:
+                self._add_station(child)
+            else:
+                yield self._index_request(child)
+
+        self._pages_since_checkpoint += 1
+        if self._pages_since_checkpoint >= self.checkpoint_pages:
+            save_station_index(self.index_json, self.index)
+            self._pages_since_checkpoint = 0
+    # end parse()
+
+    def closed(self, reason: str) -> None:
+        '''
+        Called by Scrapy when the spider closes, including following a
+        graceful shutdown, to write the station index.
+        '''
+        save_station_index(self.index_json, self.index)
+        self.logger.info("Station index of %d stations saved to file %s (%s)",
+                         len(self.index['stations']), self.index_json, reason)
+    # end closed()
+
+    def _index_request(self, path: str) -> scrapy.Request:
+        '''
+        Create request for the index page at ``path``, adding the validators
+        saved from a previous crawl when re-discovering incrementally.
+        '''
+        headers = {}
+        page = self.index['pages'].get(path)
+        if self.incremental and page is not None:
+            if page.get('etag'):
+                headers['If-None-Match'] = page['etag']
+            if page.get('last_modified'):
+                headers['If-Modified-Since'] = page['last_modified']
+        return scrapy.Request(self.site_url + path, self.parse,
+                              headers=headers, meta={'index_path': path})
+    # end _index_request()
+
+    def _add_station(self, station_path: str) -> None:
+        '''
+        Add the station at ``station_path`` to the station index.
+        '''
+        if station_path in self.index['stations']:
+            return
+        self.index['stations'][station_path] = {
+            'name': station_path.rsplit('/', 1)[1].replace('-', ' '),
+            'url_path': station_path,
+            'region': station_path.rsplit('/', 1)[0],
+            'time_zone': resolve_time_zone(station_path)
+        }
+        self.crawler.stats.inc_value('stations/discovered')
+    # end _add_station()
+
+    def _rm_stations(self, region_path: str, station_paths: list) -> None:
+        '''
+        Remove stations of region ``region_path`` that are no longer linked
+        from the region's area page.
+        '''
+        stations = self.index['stations']
+        for station_path in [s for s, v in stations.items()
+                             if v['region'] == region_path and s not in station_paths]:
+            self.logger.info("Station no longer listed, removing: '%s'", station_path)
+            del stations[station_path]
+    # end _rm_stations()
+
+    def _rm_subtree(self, path: str) -> None:
+        '''
+        Remove the index pages and stations at and below ``path``, a country,
+        region or area page no longer linked from the page above it.
+        '''
+        prefix = path + '/'
+        stations = self.index['stations']
+        removed = [s for s in stations if s.startswith(prefix)]
+        for station_path in removed:
+            del stations[station_path]
+        pages = self.index['pages']
+        for page_path in [p for p in pages if p == path or p.startswith(prefix)]:
+            del pages[page_path]
+        self.logger.info("Index page no longer listed, removing '%s' and its %d stations",
+                         path, len(removed))
+    # end _rm_subtree()
+
+    @staticmethod
+    def _get_child_paths(path: str, response) -> list:
+        '''
+        From an index page return, in page order, the unique URL paths of the
+        pages exactly one level below ``path`` in the hierarchy.
+        '''
+        children = []
+        depth = TideschartStationsSpider._path_depth(path) + 1
+        for href in TideschartStationsSpider._iter_hrefs(response):
+            url = urlparse(response.urljoin(href))
+            if url.netloc != urlparse(response.url).netloc:
+                continue
+            child = url.path.strip('/')
+            if TideschartStationsSpider._path_depth(child) != depth:
+                continue
+            if path and not child.startswith(path + '/'):
+                continue
+            if child not in children:
+                children.append(child)
+        return children
+    # end _get_child_paths()
+
+    @staticmethod
+    def _iter_hrefs(response) -> Iterator[str]:
+        '''
+        Yield the links of an index page, ignoring in page anchors.
+        '''
+        for href in response.xpath('//a/@href').getall():
+            if href.startswith('#'):
+                continue
+            yield href
+
+    @staticmethod
+    def _path_depth(path: str) -> int:
+        '''
+        Return the number of segments in URL path, the home page is depth 0.
+        '''
+        return len(path.split('/')) if path else 0
+
+    @staticmethod
+    def _header(response, name: bytes) -> str:
+        '''
+        Return response header ``name`` as str or None if not present.
+        '''
+        value = response.headers.get(name)
+        return value.decode('latin-1') if value is not None else None
+
+# end class TideschartStationsSpider
@@ -1,18 +1,44 @@
 #!/usr/bin/env python
 """
 A spider to scrape tide times from http://tideschart.com/.
+
+By default the scrape fails if any tide table cell cannot be parsed. With
+``-a tolerant=True`` cells that cannot be parsed are recorded, logged and
+skipped so the rest of the page is still scraped. A cell in a tide column
+of the table that shows a time, but is not marked up as a tide, also counts
+as a cell that cannot be parsed. The proportion of cells that fail to parse
+is monitored and an error logged when it reaches ``drift_threshold``
+(``-a drift_threshold=0.1`` by default), the likely cause being a change of
+the web site's markup. An error is also logged when no tides at all are
+parsed from a page. The counts are kept in the crawl stats and, across the
+scrapes of many stations, in the scrape schedule, see
+:class:`GetTides.pipelines.ScheduleRecordPipeline`.
+
+Tide times are local times of the station. The station's time zone is
+resolved from its URL path, see :mod:`GetTides.timezones`, or may be given
+with ``-a time_zone=<IANA time zone>``; the spider refuses to run if it can
+be neither. The dates of the tide table's days are those of the station's
+time zone, checked against the day of the month shown in the table.
 """
 
 # Standard modules
 import datetime
+import zoneinfo
 import os
 import re
 from enum import Enum
 from typing import Tuple
+from urllib.parse import urlparse
 
 # Third-party modules
 import scrapy
 
+# Local modules
+from GetTides.timezones import resolve_time_zone
+
+# Minimum number of tide cells parsed before markup drift is reported
+DRIFT_MIN_CELLS = 20
+
 TIDESCHART_WEB_SITE = 'http://tideschart.com/'
 DALGETY_BAY_URL = 'United-Kingdom/Scotland/Edinburgh/Dalgety-Bay-Beach'
 
@@ -27,6 +53,25 @@ re_get_info_from_tide = re.compile('<td class="(tide-[du])">' + \
                                    '[ ]*([0-9]+:[0-9]+[apm]+)' + \
                                    '<div><i>[▼▲]</i>[ ]*([0-9]+[.0-9]* m)</div></td>')
 
+# Regular expression to get the day of the month from a tide table `day` entry, e.g.
+# '<td class="day">29 Sat</td>'
+re_get_day_of_month = re.compile('>[ ]*([0-9]+)')
+
+# Regular expression to find a tide time in a tide table cell, whatever its markup
+re_find_tide_time = re.compile('[0-9]{1,2}:[0-9]{2}[ ]*[apAP][mM]')
+
+# Lookup table translating tide time from am/pm to 24hr clock, e.g. both
+# '3:11pm' and '03:11pm' translate to '15:11:00'. Saves a strptime() and
+# strftime() call per tide.
+TIME_24H = {}
+for _hour in range(24):
+    for _minute in range(60):
+        _hour_12 = _hour % 12 if _hour % 12 else 12
+        _am_pm = 'am' if _hour < 12 else 'pm'
+        TIME_24H[f'{_hour_12}:{_minute:02d}{_am_pm}'] = \
+            TIME_24H[f'{_hour_12:02d}:{_minute:02d}{_am_pm}'] = \
+            f'{_hour:02d}:{_minute:02d}:00'
+
 
 class OrdinalNum(Enum):
     '''
@@ -69,6 +114,10 @@ class TideschartSpider(scrapy.Spider):
     def __init__(self,
                  save_page: str = 'False',
                  tide_url: str = DALGETY_BAY_URL,
+                 site_url: str = TIDESCHART_WEB_SITE,
+                 time_zone: str = None,
+                 tolerant: str = 'False',
+                 drift_threshold: str = '0.1',
                  *args, **kwargs):
         # To stop pylint super-with-arguments refactoring message
         #   super(TideschartSpider, self).__init__(*args, **kwargs)
@@ -77,7 +126,31 @@ class TideschartSpider(scrapy.Spider):
 
         # Convert save_page arg from str to bool
         self.save_page = save_page.lower() == 'true'
-        self.tide_url = TIDESCHART_WEB_SITE + tide_url
+        self.station_path = tide_url
+        # site_url allows a copy of the web site, e.g. a local test server, to
+        # be scraped
+        if not site_url.endswith('/'):
+            site_url += '/'
+        if site_url != TIDESCHART_WEB_SITE:
+            self.allowed_domains = [urlparse(site_url).hostname]
+        self.tide_url = site_url + tide_url
+        # Time zone of the station's tide times, resolved from its URL path
+        # unless given. Tide times are never given a guessed time zone.
+        self.time_zone = time_zone if time_zone else resolve_time_zone(tide_url)
+        if self.time_zone is None:
+            raise ValueError(f"Cannot resolve time zone of station '{tide_url}', " +
+                             "give it with -a time_zone=<IANA time zone>")
+        # Raises ZoneInfoNotFoundError if time zone is not in the time zone database
+        self.zone = zoneinfo.ZoneInfo(self.time_zone)
+
+        # Convert tolerant and drift_threshold args from str
+        self.tolerant = tolerant.lower() == 'true'
+        self.drift_threshold = float(drift_threshold)
+        # Tide cells that could not be parsed, in tolerant mode, as tuples of
+        # (tide_url, date, cell)
+        self.bad_cells = []
+        self.cells_parsed = 0
+        self.drift_reported = False
 
     def start_requests(self):
         yield scrapy.Request(self.tide_url, self.parse)
@@ -95,15 +168,18 @@ class TideschartSpider(scrapy.Spider):
         yield {
             'meta_tide_url': self.tide_url,
             'meta_tide_location': self.tide_url.rsplit('/', 1)[1].replace('-', ' '),
-            'meta_scrape_time': scrape_time.strftime("%Y-%m-%dT%H:%M:%S")
+            'meta_scrape_time': scrape_time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'meta_tide_timezone': self.time_zone
         }
 
         # tide_list is used to store a consequtive list of the scraped tides
         tide_list = []
 
-        # Tides webpage contains tides for 7 days (day 1 is today)
+        # Tides webpage contains tides for 7 days (day 1 is today at the
+        # station, which may not be today where the scrape runs)
+        station_date = datetime.datetime.now(self.zone).date()
         for day_id in range(1, 8):
-            date_str, day_data = TideschartSpider._get_day_data(scrape_time, day_id, response)
+            date_str, day_data = TideschartSpider._get_day_data(station_date, day_id, response)
 
             # Get all tides for today - 2 = 1st tide, 3 = 2nd tide, 4 = 3rd tide, ...
             scrape_tide_data = []
@@ -113,6 +189,7 @@ class TideschartSpider(scrapy.Spider):
             for tide_seq in range(2, 6):
                 # A tide can be either low (tide-d) or high (tide-u) - we don't
                 # know which before we look so we look for both
+                tide_found = False
                 for tide_state in ['tide-d', 'tide-u']:
                     this_tide = response.xpath(
                         f'//tr[(((count(preceding-sibling::*) + 1) = {day_id}) and parent::*)]' \
@@ -122,9 +199,17 @@ class TideschartSpider(scrapy.Spider):
                             f'{tide_seq}) and parent::*)]').get()
                     if this_tide is None:
                         continue
+                    tide_found = True
                     scrape_tide_data.append(this_tide)
-                    tide_time, tide_is_high, tide_height = \
-                        TideschartSpider._extract_tide_info(this_tide)
+                    try:
+                        tide_time, tide_is_high, tide_height = \
+                            TideschartSpider._extract_tide_info(this_tide)
+                    except RuntimeError as exc:
+                        if not self.tolerant:
+                            raise
+                        self._record_bad_cell(date_str, this_tide, exc)
+                        continue
+                    self.cells_parsed += 1
                     tide_list.append({
                         'date_time': date_str + "T" + tide_time,
                         'number': str(tide_num_in_day),
@@ -132,6 +217,9 @@ class TideschartSpider(scrapy.Spider):
                         'height': tide_height
                     })
 
+                if not tide_found:
+                    self._check_unmarked_cell(response, day_id, tide_seq, date_str)
+
                 # Progress to next tide in the day
                 tide_num_in_day = tide_num_in_day.next()
 
@@ -142,11 +230,65 @@ class TideschartSpider(scrapy.Spider):
                 'scrape_tides': scrape_tide_data
             }
 
+        if hasattr(self, 'crawler'):
+            self.crawler.stats.set_value('tideschart/cells_parsed', self.cells_parsed)
+        if not tide_list:
+            if hasattr(self, 'crawler'):
+                self.crawler.stats.inc_value('tideschart/pages_without_tides')
+            self.logger.error("Markup drift suspected: no tides parsed from %s",
+                              response.url)
+        self._check_drift()
+
         yield{
             'tide_list': tide_list
         }
     # end parse()
 
+    def _record_bad_cell(self, date_str: str, cell: str, exc: Exception) -> None:
+        '''
+        Record tide table cell that could not be parsed.
+        '''
+        self.bad_cells.append((self.tide_url, date_str, cell))
+        if hasattr(self, 'crawler'):
+            self.crawler.stats.inc_value('tideschart/cells_failed')
+        self.logger.warning("Skipping tide cell of %s: %s", date_str, exc)
+
+    def _check_unmarked_cell(self, response, day_id: int, tide_seq: int,
+                             date_str: str) -> None:
+        '''
+        Check the cell at ``tide_seq`` of the tide table row of ``day_id``,
+        which has no tide markup, does not show a tide time. A day with only
+        3 tides has an empty 4th tide cell, a cell that shows a time is a
+        tide whose markup has changed and cannot be parsed.
+        '''
+        cells = response.xpath(
+            f'//tr[(((count(preceding-sibling::*) + 1) = {day_id}) and parent::*)]' \
+            f'/*[(count(preceding-sibling::*) + 1) = {tide_seq}]').getall()
+        for cell in cells:
+            if re_find_tide_time.search(cell) is None:
+                continue
+            exc = RuntimeError(f"Tide cell without tide markup '{cell}'")
+            if not self.tolerant:
+                raise exc
+            self._record_bad_cell(date_str, cell, exc)
+    # end _check_unmarked_cell()
+
+    def _check_drift(self) -> None:
+        '''
+        Log an error, once per crawl, when the proportion of tide cells that
+        failed to parse reaches ``drift_threshold``.
+        '''
+        num_cells = self.cells_parsed + len(self.bad_cells)
+        if self.drift_reported or num_cells < DRIFT_MIN_CELLS:
+            return
+        fail_ratio = len(self.bad_cells) / num_cells
+        if fail_ratio >= self.drift_threshold:
+            self.drift_reported = True
+            self.logger.error("Markup drift suspected: %d of %d tide cells (%.0f%%) " +
+                              "failed to parse, e.g. '%s'", len(self.bad_cells),
+                              num_cells, 100 * fail_ratio, self.bad_cells[-1][2])
+    # end _check_drift()
+
     def _save_webpage(self, scrape_time: datetime.datetime, response) -> None:
         '''
         If user has requested the scraped webpage to be saved to local file
@@ -170,15 +312,19 @@ class TideschartSpider(scrapy.Spider):
     # end _save_webpage()
 
     @staticmethod
-    def _get_day_data(scrape_time: datetime.datetime,
+    def _get_day_data(station_date: datetime.date,
                       day_id: int, response) -> Tuple[str, str]:
         '''
         From the scraped webpage calculate the date information of the
-        requested day.
-
-        :param scrape_time: used to calculate the date relating to `day_id`
-        :type scrape_time: str
-        :param day_id: used to calculate the date of tides by _adding_ to `scrape_time`
+        requested day. Should the day of the month shown on the webpage be
+        that of the day before or after the calculated date, e.g. the page
+        was generated just before the station's midnight, the date shown is
+        used.
+
+        :param station_date: today's date at the station, used to calculate \
+            the date relating to `day_id`
+        :type station_date: datetime.date
+        :param day_id: used to calculate the date of tides by _adding_ to `station_date`
         :type day_id: int
 
         :return: Tuple containing 2 items:
@@ -188,13 +334,23 @@ class TideschartSpider(scrapy.Spider):
         :rtype: (str, str)
         '''
         # Calculate date of tides
-        date = scrape_time + datetime.timedelta(days=day_id-1)
-        date_str = date.strftime("%Y-%m-%d")
+        date = station_date + datetime.timedelta(days=day_id-1)
 
         day_data = response.xpath(
             f'//tr[(((count(preceding-sibling::*) + 1) = {day_id}) and parent::*)]' \
             '//*[contains(concat( " ", @class, " " ), concat( " ", "day", " " )) ]').get()
 
+        # Check date against day of month shown, e.g. 29 of "<td class="day">29 Sat</td>"
+        day_match = re_get_day_of_month.search(day_data) if day_data else None
+        if day_match is not None and int(day_match.group(1)) != date.day:
+            for offset in (-1, 1):
+                shown_date = date + datetime.timedelta(days=offset)
+                if shown_date.day == int(day_match.group(1)):
+                    date = shown_date
+                    break
+
+        date_str = date.strftime("%Y-%m-%d")
+
         return date_str, day_data
     # end _get_day_data()
 
@@ -236,8 +392,14 @@ class TideschartSpider(scrapy.Spider):
             raise RuntimeError(exc_msg)
 
         # Translate tide time from am/pm to 24hr clock
-        time_12h = datetime.datetime.strptime(time_raw, "%I:%M%p")
-        time = time_12h.strftime("%H:%M:%S")
+        time = TIME_24H.get(time_raw)
+        if time is None:
+            try:
+                time_12h = datetime.datetime.strptime(time_raw, "%I:%M%p")
+            except ValueError as exc:
+                raise RuntimeError(f"Cannot parse tide time '{time_raw}' from " +
+                                   f"'{tide_data}'") from exc
+            time = time_12h.strftime("%H:%M:%S")
 
         # Remove space between tide height digits and units,
         # e.g. "5.2 8m" becomes "5.28m"
@@ -0,0 +1,139 @@
+"""
+Resolve the time zone of a tideschart station from its URL path.
+
+Tide times on http://tideschart.com/ are local times of the station, without
+time zone. The time zone is resolved from the station's country, the first
+segment of its URL path, or for countries spanning several time zones from
+its country and region, e.g.::
+
+    >>> resolve_time_zone('United-Kingdom/Scotland/Edinburgh/Dalgety-Bay-Beach')
+    'Europe/London'
+    >>> resolve_time_zone('United-States/California/San-Francisco-County/Ocean-Beach')
+    'America/Los_Angeles'
+
+Resolved time zones are cached, so each station is resolved once, and
+validated against the IANA time zone database using :mod:`zoneinfo`. A
+station whose country, or country and region, is not in the tables below is
+not given a guessed time zone, its time zone must be given explicitly, e.g.
+``scrapy crawl tideschart -a time_zone=America/Mexico_City``.
+"""
+
+# Standard modules
+import functools
+import logging
+import zoneinfo
+
+# Time zone of countries with a single time zone
+COUNTRY_TIME_ZONES = {
+    'Argentina': 'America/Argentina/Buenos_Aires',
+    'Bahamas': 'America/Nassau',
+    'Belgium': 'Europe/Brussels',
+    'Chile': 'America/Santiago',
+    'China': 'Asia/Shanghai',
+    'Croatia': 'Europe/Zagreb',
+    'Cyprus': 'Asia/Nicosia',
+    'Denmark': 'Europe/Copenhagen',
+    'Egypt': 'Africa/Cairo',
+    'Estonia': 'Europe/Tallinn',
+    'Finland': 'Europe/Helsinki',
+    'France': 'Europe/Paris',
+    'Germany': 'Europe/Berlin',
+    'Greece': 'Europe/Athens',
+    'Guernsey': 'Europe/Guernsey',
+    'Iceland': 'Atlantic/Reykjavik',
+    'India': 'Asia/Kolkata',
+    'Ireland': 'Europe/Dublin',
+    'Isle-of-Man': 'Europe/Isle_of_Man',
+    'Israel': 'Asia/Jerusalem',
+    'Italy': 'Europe/Rome',
+    'Jamaica': 'America/Jamaica',
+    'Japan': 'Asia/Tokyo',
+    'Jersey': 'Europe/Jersey',
+    'Malta': 'Europe/Malta',
+    'Morocco': 'Africa/Casablanca',
+    'Netherlands': 'Europe/Amsterdam',
+    'New-Zealand': 'Pacific/Auckland',
+    'Norway': 'Europe/Oslo',
+    'Philippines': 'Asia/Manila',
+    'Poland': 'Europe/Warsaw',
+    'Portugal': 'Europe/Lisbon',
+    'Singapore': 'Asia/Singapore',
+    'South-Africa': 'Africa/Johannesburg',
+    'South-Korea': 'Asia/Seoul',
+    'Spain': 'Europe/Madrid',
+    'Sweden': 'Europe/Stockholm',
+    'Thailand': 'Asia/Bangkok',
+    'Turkey': 'Europe/Istanbul',
+    'United-Arab-Emirates': 'Asia/Dubai',
+    'United-Kingdom': 'Europe/London',
+    'Vietnam': 'Asia/Ho_Chi_Minh',
+}
+
+# Time zone of regions of countries with several time zones, keyed by
+# (country, region)
+REGION_TIME_ZONES = {
+    ('Australia', 'New-South-Wales'): 'Australia/Sydney',
+    ('Australia', 'Northern-Territory'): 'Australia/Darwin',
+    ('Australia', 'Queensland'): 'Australia/Brisbane',
+    ('Australia', 'South-Australia'): 'Australia/Adelaide',
+    ('Australia', 'Tasmania'): 'Australia/Hobart',
+    ('Australia', 'Victoria'): 'Australia/Melbourne',
+    ('Australia', 'Western-Australia'): 'Australia/Perth',
+    ('Canada', 'British-Columbia'): 'America/Vancouver',
+    ('Canada', 'New-Brunswick'): 'America/Moncton',
+    ('Canada', 'Newfoundland-and-Labrador'): 'America/St_Johns',
+    ('Canada', 'Nova-Scotia'): 'America/Halifax',
+    ('Canada', 'Prince-Edward-Island'): 'America/Halifax',
+    ('Canada', 'Quebec'): 'America/Toronto',
+    ('United-States', 'Alabama'): 'America/Chicago',
+    ('United-States', 'Alaska'): 'America/Anchorage',
+    ('United-States', 'California'): 'America/Los_Angeles',
+    ('United-States', 'Connecticut'): 'America/New_York',
+    ('United-States', 'Delaware'): 'America/New_York',
+    ('United-States', 'Florida'): 'America/New_York',
+    ('United-States', 'Georgia'): 'America/New_York',
+    ('United-States', 'Hawaii'): 'Pacific/Honolulu',
+    ('United-States', 'Louisiana'): 'America/Chicago',
+    ('United-States', 'Maine'): 'America/New_York',
+    ('United-States', 'Maryland'): 'America/New_York',
+    ('United-States', 'Massachusetts'): 'America/New_York',
+    ('United-States', 'Mississippi'): 'America/Chicago',
+    ('United-States', 'New-Hampshire'): 'America/New_York',
+    ('United-States', 'New-Jersey'): 'America/New_York',
+    ('United-States', 'New-York'): 'America/New_York',
+    ('United-States', 'North-Carolina'): 'America/New_York',
+    ('United-States', 'Oregon'): 'America/Los_Angeles',
+    ('United-States', 'Rhode-Island'): 'America/New_York',
+    ('United-States', 'South-Carolina'): 'America/New_York',
+    ('United-States', 'Texas'): 'America/Chicago',
+    ('United-States', 'Virginia'): 'America/New_York',
+    ('United-States', 'Washington'): 'America/Los_Angeles',
+}
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_time_zone(station_path: str) -> str:
+    '''
+    Return the IANA time zone name of the station at ``station_path``.
+
+    :param station_path: Station URL path, e.g. \
+        ``United-Kingdom/Scotland/Edinburgh/Dalgety-Bay-Beach``
+    :type station_path: str
+
+    :return: Time zone name, None if the time zone cannot be resolved.
+    :rtype: str
+    '''
+    segments = station_path.strip('/').split('/')
+    country = segments[0]
+    region = segments[1] if len(segments) > 1 else None
+
+    time_zone = REGION_TIME_ZONES.get((country, region), COUNTRY_TIME_ZONES.get(country))
+    if time_zone is None:
+        logging.getLogger(__name__).warning(
+            "Cannot resolve time zone of station '%s'", station_path)
+        return None
+
+    # Raises ZoneInfoNotFoundError if time zone is not in the time zone database
+    zoneinfo.ZoneInfo(time_zone)
+    return time_zone
+# end resolve_time_zone()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+Crawl throughput benchmark of the tideschart spider.
+
+Serves a synthetic tideschart web site, see :mod:`benchmarks.tideschart_fixtures`,
+in a separate process and crawls N of its stations with
+:class:`GetTides.spiders.tideschart.TideschartSpider`, then reports:
+
+ * pages/s - station pages crawled per second of wall clock time,
+ * parse time per page - mean time spent in ``TideschartSpider.parse``,
+ * peak RSS - peak resident set size of the crawling process.
+
+E.g. to crawl 1000 stations, the server responding to each request after
+20ms::
+
+    python -m benchmarks.crawl_benchmark -n 1000 -l 0.02
+"""
+
+# Standard modules
+import multiprocessing
+import resource
+import socket
+import sys
+import time
+
+# Third-party modules
+import plac
+import scrapy
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+# Local modules
+from benchmarks.tideschart_fixtures import serve, station_paths
+from GetTides.spiders.tideschart import TideschartSpider
+
+
+class BenchmarkSpider(TideschartSpider):
+    """
+    Tideschart spider crawling many stations, timing the spider's parsing of
+    each station page.
+    """
+    name = 'tideschart_benchmark'
+
+    # pylint: disable=keyword-arg-before-vararg
+    def __init__(self, stations: list = None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.site_url = self.tide_url[:-len(self.station_path)]
+        self.stations = stations
+        self.pages = 0
+        self.items = 0
+        self.parse_secs = 0.0
+
+    def start_requests(self):
+        for station in self.stations:
+            yield scrapy.Request(self.site_url + station, self.parse)
+
+    def parse(self, response, **kwargs):
+        # The spider parses a single station, given by tide_url
+        self.tide_url = response.url
+        start = time.perf_counter()
+        items = list(super().parse(response, **kwargs))
+        self.parse_secs += time.perf_counter() - start
+        self.pages += 1
+        self.items += len(items)
+        yield from items
+
+# end class BenchmarkSpider
+
+
+def _wait_for_port(port: int, timeout: float=10.0) -> None:
+    '''
+    Wait for the fixture server to accept connections on ``port``.
+    '''
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection(('localhost', port), timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+@plac.opt('num_stations', "Number of stations to crawl.", type=int)
+@plac.opt('port', "Port to serve synthetic web site on.", type=int)
+@plac.opt('latency', "Seconds server waits before responding to each request.",
+          type=float)
+@plac.opt('concurrency', "Scrapy CONCURRENT_REQUESTS and CONCURRENT_REQUESTS_PER_DOMAIN.",
+          type=int)
+@plac.opt('three_tide_days', "When False every day has 4 tides, otherwise days " + \
+          "with only 3 tides occur.", type=bool, abbrev='3')
+def main(num_stations: int=500, port: int=8080, latency: float=0.0,
+         concurrency: int=16, three_tide_days: bool=True):
+    '''
+    Crawl synthetic tideschart stations and report crawl throughput.
+    '''
+    server = multiprocessing.Process(target=serve, daemon=True,
+                                     args=(num_stations, port, latency, three_tide_days))
+    server.start()
+    try:
+        _wait_for_port(port)
+
+        settings = get_project_settings()
+        settings.set('ITEM_PIPELINES', {})
+        settings.set('ROBOTSTXT_OBEY', False)
+        settings.set('LOG_LEVEL', 'WARNING')
+        settings.set('CONCURRENT_REQUESTS', concurrency)
+        settings.set('CONCURRENT_REQUESTS_PER_DOMAIN', concurrency)
+        settings.set('DOWNLOAD_DELAY', 0)
+        settings.set('AUTOTHROTTLE_ENABLED', False)
+        settings.set('TELNETCONSOLE_ENABLED', False)
+
+        process = CrawlerProcess(settings)
+        crawler = process.create_crawler(BenchmarkSpider)
+        process.crawl(crawler, stations=list(station_paths(num_stations)),
+                      site_url=f'http://localhost:{port}/', time_zone='Europe/London')
+        start = time.perf_counter()
+        process.start()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+
+    spider = crawler.spider
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak_rss //= 1024
+
+    print(f"Stations crawled     : {spider.pages} of {num_stations}")
+    print(f"Items produced       : {spider.items}")
+    print(f"Elapsed time         : {elapsed:.2f} s")
+    print(f"Pages/s              : {spider.pages / elapsed:.1f}")
+    print(f"Parse time per page  : {1000 * spider.parse_secs / max(spider.pages, 1):.2f} ms")
+    print(f"Peak RSS             : {peak_rss / 1024:.1f} MiB")
+
+# end main()
+
+if __name__ == '__main__':
+    plac.call(main)
+
+# end-of-file
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Microbenchmark of tide calendar event creation.
+
+Creates the events of N synthetic tides, by default 100k, using the event
+creation of :func:`add_cal_events.get_new_tide_events` before the event
+template was introduced and using :class:`event_template.TideEventTemplate`,
+checks both create identical events and reports the time each takes. The
+time to write the events as a JSON Lines request stream is also reported::
+
+    python -m benchmarks.event_template_benchmark -n 100000
+"""
+
+# Standard modules
+import datetime
+import io
+import os
+import sys
+import time
+
+# Third-party modules
+import plac
+
+# AddEvents modules import each other as top level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'AddEvents'))
+
+# Local modules
+# pylint: disable=wrong-import-position
+from event_template import STATION_PROPERTY, TideEventTemplate, event_description
+from sync_journal import tide_event_id
+
+SCRAPE_META = {'meta_tide_url': 'http://tideschart.com/United-Kingdom/Scotland/' +
+                                'Edinburgh/Dalgety-Bay-Beach',
+               'meta_tide_location': 'Dalgety Bay Beach',
+               'meta_scrape_time': '2021-06-10T21:36:02'}
+
+
+def synthetic_tides(num_tides: int) -> list:
+    '''
+    Return ``num_tides`` tides, as in the scraped ``tide_list``, 6h12m apart.
+    '''
+    tide_time = datetime.datetime(2021, 6, 10, 3, 32)
+    tides = []
+    for index in range(num_tides):
+        tides.append({'date_time': tide_time.strftime('%Y-%m-%dT%H:%M:%S'),
+                      'number': ('1st', '2nd', '3rd', '4th')[index % 4],
+                      'is_high': index % 2 == 0,
+                      'height': f"{5.28 if index % 2 == 0 else 1.22}m"})
+        tide_time += datetime.timedelta(hours=6, minutes=12, seconds=30)
+        tide_time = tide_time.replace(second=0)
+    return tides
+
+
+def per_tide_events(scrape_meta: dict, tide_data: list,
+                    now_datetime: datetime.datetime) -> list:
+    '''
+    Create events as get_new_tide_events() did before the event template,
+    building each event from scratch.
+    '''
+    desc_text = event_description(scrape_meta, now_datetime)
+    tide_url = scrape_meta['meta_tide_url']
+    new_tide_events = []
+    for tide in tide_data:
+        if tide['is_high']:
+            state = 'HIGH'
+            color_id = 9 # blue
+        else:
+            state = 'low'
+            color_id = 11 # red
+        tide_datetime = datetime.datetime.fromisoformat(tide['date_time'])
+        event_end_datetime = tide_datetime + datetime.timedelta(minutes=20)
+        event = {
+            'id': tide_event_id(tide_url, tide['date_time']),
+            'summary': f"{tide['number']} tide {state} {tide['height']}",
+            'description': desc_text,
+            'colorId': color_id,
+            'start': {
+                'dateTime': f"{tide['date_time']}",
+                'timeZone': 'Europe/London',
+            },
+            'end': {
+                'dateTime': f"{event_end_datetime.strftime('%Y-%m-%dT%H:%M:%S')}",
+                'timeZone': 'Europe/London',
+            },
+            'extendedProperties': {
+                'private': {STATION_PROPERTY: tide_url},
+            }
+        }
+        new_tide_events.append(event)
+    return new_tide_events
+
+
+def _best_of(repeat: int, func, *args) -> tuple:
+    '''
+    Return the result and best time in seconds of ``repeat`` calls of ``func``.
+    '''
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+@plac.opt('num_tides', "Number of tides to create events of.", type=int)
+@plac.opt('repeat', "Number of times each is timed, the best time is reported.",
+          type=int)
+def main(num_tides: int=100000, repeat: int=5):
+    '''
+    Time creation of tide events with and without the event template.
+    '''
+    tides = synthetic_tides(num_tides)
+    now_datetime = datetime.datetime(2021, 6, 10, 21, 40)
+
+    per_tide, per_tide_secs = _best_of(repeat, per_tide_events, SCRAPE_META, tides,
+                                       now_datetime)
+
+    def template_events():
+        template = TideEventTemplate(SCRAPE_META, now_datetime=now_datetime)
+        return list(template.events(tides))
+    templated, template_secs = _best_of(repeat, template_events)
+
+    if templated != per_tide:
+        raise RuntimeError("Event template does not create identical events")
+
+    def template_jsonl():
+        template = TideEventTemplate(SCRAPE_META, now_datetime=now_datetime)
+        jsonl_out = io.StringIO()
+        template.write_jsonl(tides, jsonl_out)
+        return jsonl_out.tell()
+    jsonl_chars, jsonl_secs = _best_of(repeat, template_jsonl)
+
+    print(f"Tides                  : {num_tides}")
+    print(f"Per tide events        : {per_tide_secs:.3f} s " +
+          f"({1e6 * per_tide_secs / num_tides:.2f} us/event)")
+    print(f"Event template         : {template_secs:.3f} s " +
+          f"({1e6 * template_secs / num_tides:.2f} us/event)")
+    print(f"Speed up               : {per_tide_secs / template_secs:.2f}x")
+    print(f"Event template JSONL   : {jsonl_secs:.3f} s " +
+          f"({jsonl_chars / 1e6:.1f} M characters)")
+
+# end main()
+
+if __name__ == '__main__':
+    plac.call(main)
+
+# end-of-file
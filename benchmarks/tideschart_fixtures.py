@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""
+Synthetic tideschart web site for exercising the GetTides spiders without
+using the live web site.
+
+Pages are generated for any number of stations. Each station page contains a
+7 day tide table in the format parsed by
+:data:`GetTides.spiders.tideschart.re_get_info_from_tide`, e.g.::
+
+    <tr><td class="day">10 Thu</td>
+        <td class="tide-u"> 3:32am<div><i>▲</i> 5.28 m</div></td>
+        <td class="tide-d"> 9:11am<div><i>▼</i> 1.22 m</div></td>
+        <td class="tide-u"> 3:47pm<div><i>▲</i> 5.2 m</div></td>
+        <td class="tide-d"> 9:21pm<div><i>▼</i> 1.28 m</div></td></tr>
+
+Tides follow a 12 hour 25 minute cycle so, as on the real web site, a day
+occasionally has only 3 tides, optionally every day has 4 tides. The country,
+region and area index pages linking to the stations are also generated so the ``tideschart_stations``
+spider can crawl the site. Station URL paths have the form::
+
+    Country-01/Region-01/Area-01/Station-00001
+
+Pages are generated deterministically from their URL path. To serve 1000
+stations on port 8080, responding to each request after 50ms::
+
+    python -m benchmarks.tideschart_fixtures -n 1000 -p 8080 -l 0.05
+
+then scrape one of the stations::
+
+    scrapy crawl tideschart -a site_url=http://localhost:8080/ \\
+        -a tide_url=Country-01/Region-01/Area-01/Station-00001 \\
+        -a time_zone=Europe/London -O data/fixture.json
+"""
+
+# Standard modules
+import datetime
+import random
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+# Third-party modules
+import plac
+
+# Number of links on each country, region and area index page
+FANOUT = 10
+
+# Time between consecutive high tides
+TIDE_PERIOD = datetime.timedelta(hours=12, minutes=25)
+
+# Number of days in a station page's tide table
+TABLE_DAYS = 7
+
+# Latest time of a day's first tide for the day to have 4 tides
+MAX_4_TIDE_START = datetime.timedelta(days=1) - TIDE_PERIOD * 3 / 2
+
+
+def station_paths(num_stations: int, fanout: int=FANOUT) -> Iterator[str]:
+    '''
+    Yield the URL paths of ``num_stations`` stations.
+    '''
+    for index in range(num_stations):
+        area, station = divmod(index, fanout)
+        region, area = divmod(area, fanout)
+        country, region = divmod(region, fanout)
+        yield f"Country-{country + 1:02d}/Region-{region + 1:02d}/" + \
+              f"Area-{area + 1:02d}/Station-{index + 1:05d}"
+
+
+def child_paths(path: str, num_stations: int, fanout: int=FANOUT) -> list:
+    '''
+    Return the URL paths of the pages one level below ``path``.
+    '''
+    depth = len(path.split('/')) if path else 0
+    children = []
+    for station in station_paths(num_stations, fanout):
+        if path and not station.startswith(path + '/'):
+            continue
+        child = '/'.join(station.split('/')[:depth + 1])
+        if child not in children:
+            children.append(child)
+    return children
+
+
+def _tide_cell(tide_time: datetime.datetime, is_high: bool, height: float) -> str:
+    '''
+    Return tide table cell in tideschart format.
+    '''
+    # Heights are shown with up to 2 decimal places, e.g. '5.28 m' or '5 m'
+    height_str = f"{height:.2f}".rstrip('0').rstrip('.')
+    time_str = tide_time.strftime('%I:%M%p').lstrip('0').lower()
+    if is_high:
+        return f'<td class="tide-u"> {time_str}<div><i>▲</i> {height_str} m</div></td>'
+    return f'<td class="tide-d"> {time_str}<div><i>▼</i> {height_str} m</div></td>'
+
+
+def station_page(path: str, start_date: datetime.date, three_tide_days: bool=True) -> str:
+    '''
+    Return the page of the station at URL path ``path`` containing the tides
+    for ``TABLE_DAYS`` days from ``start_date``. When ``three_tide_days`` is
+    False every day has 4 tides, the time of a day's first tide moving 50
+    minutes later each day within the hours that 4 tides fit in a day.
+    '''
+    rand = random.Random(zlib.crc32(path.encode('utf-8')))
+    mean_height = rand.uniform(2.0, 4.0)
+    range_height = rand.uniform(1.0, mean_height)
+    # Time of first high tide, at or after midnight of start_date
+    tide_time = datetime.datetime.combine(start_date, datetime.time()) + \
+        datetime.timedelta(minutes=rand.randrange(int(TIDE_PERIOD.total_seconds() / 60)))
+    # A low tide may precede the first high tide
+    if tide_time - TIDE_PERIOD / 2 >= datetime.datetime.combine(start_date, datetime.time()):
+        tide_time -= TIDE_PERIOD / 2
+        is_high = False
+    else:
+        is_high = True
+
+    rows = []
+    for day in range(TABLE_DAYS):
+        date = start_date + datetime.timedelta(days=day)
+        cells = [f'<td class="day">{date.day} {date.strftime("%a")}</td>']
+        if not three_tide_days:
+            midnight = datetime.datetime.combine(date, datetime.time())
+            tide_time = midnight + (tide_time - midnight) % MAX_4_TIDE_START
+        while tide_time.date() == date:
+            height = mean_height + (range_height if is_high else -range_height) * \
+                rand.uniform(0.85, 1.0)
+            cells.append(_tide_cell(tide_time, is_high, height))
+            tide_time += TIDE_PERIOD / 2
+            is_high = not is_high
+        # Days with 3 tides have an empty 4th tide cell
+        while len(cells) < 5:
+            cells.append('<td class="tide-none"></td>')
+        cells.append(f'<td class="sun">{rand.randint(4, 8)}:{rand.randint(10, 59)}am</td>')
+        rows.append('<tr>' + ''.join(cells) + '</tr>')
+
+    name = path.rsplit('/', 1)[-1].replace('-', ' ')
+    return '<!DOCTYPE html><html><head><title>' + name + ' Tide Times</title></head>' + \
+           '<body><h1>' + name + ' tide times</h1>' + \
+           '<table class="table table-tides"><thead><tr><th>Day</th><th>1st Tide</th>' + \
+           '<th>2nd Tide</th><th>3rd Tide</th><th>4th Tide</th><th>Sunrise</th></tr></thead>' + \
+           '<tbody>' + ''.join(rows) + '</tbody></table></body></html>'
+
+
+def index_page(path: str, num_stations: int) -> str:
+    '''
+    Return the index page at URL path ``path`` linking to the pages one level
+    below it.
+    '''
+    links = ''.join(f'<li><a href="/{child}">{child.rsplit("/", 1)[-1]}</a></li>'
+                    for child in child_paths(path, num_stations))
+    return '<!DOCTYPE html><html><head><title>Tide Times</title></head>' + \
+           '<body><a href="#top">Top</a><a href="/">Home</a><ul>' + links + \
+           '</ul></body></html>'
+
+
+def make_handler(num_stations: int, latency: float, three_tide_days: bool=True,
+                 start_date: datetime.date=None):
+    '''
+    Return a request handler class serving the synthetic web site of
+    ``num_stations`` stations, delaying each response ``latency`` seconds.
+    If ``start_date`` is None station tide tables start today.
+    '''
+    class FixtureHandler(BaseHTTPRequestHandler):
+        '''
+        Serve synthetic tideschart pages.
+        '''
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self): # pylint: disable=invalid-name
+            '''
+            Respond with the page at the requested path.
+            '''
+            if latency > 0:
+                time.sleep(latency)
+            path = self.path.split('?', 1)[0].strip('/')
+            depth = len(path.split('/')) if path else 0
+            if depth == 4:
+                body = station_page(path, start_date or datetime.date.today(),
+                                    three_tide_days)
+            elif depth < 4 and (depth == 0 or child_paths(path, num_stations)):
+                body = index_page(path, num_stations)
+            else:
+                body = None
+
+            if body is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args): # pylint: disable=redefined-builtin
+            pass
+
+    return FixtureHandler
+
+
+def serve(num_stations: int, port: int, latency: float, three_tide_days: bool=True) -> None:
+    '''
+    Serve the synthetic web site until interrupted.
+    '''
+    server = ThreadingHTTPServer(('localhost', port),
+                                 make_handler(num_stations, latency, three_tide_days))
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+@plac.opt('num_stations', "Number of stations.", type=int)
+@plac.opt('port', "Port to serve pages on.", type=int)
+@plac.opt('latency', "Seconds to wait before responding to each request.", type=float)
+@plac.opt('three_tide_days', "When False every day has 4 tides, otherwise days " + \
+          "with only 3 tides occur as on the real web site.", type=bool, abbrev='3')
+def main(num_stations: int=1000, port: int=8080, latency: float=0.0,
+         three_tide_days: bool=True):
+    '''
+    Serve a synthetic tideschart web site.
+    '''
+    print(f"Serving {num_stations} stations on http://localhost:{port}/, first " +
+          f"station: {next(station_paths(num_stations))}")
+    serve(num_stations, port, latency, three_tide_days)
+
+# end main()
+
+if __name__ == '__main__':
+    plac.call(main)
+
+# end-of-file